@@ -0,0 +1,54 @@
+# Latency and throughput of a forecast (one window in, the whole horizon out) with the keras model and with the
+# exported engines. The model has random weights, the timings do not depend on them.
+# Run from the repository root: python -m benchmarks.inference_benchmark [num_threads]
+
+import sys
+import time
+import numpy as np
+from web_service.classes.time_series.forecaster import build_model
+from web_service.classes.time_series.inference import InferenceEngine
+
+INPUT_STEPS, HORIZON_STEPS, N_FEATURES = 300, 250, 14
+
+
+def measure(forward, windows : np.ndarray, warmup : int = 5):
+    for window in windows[:warmup]:
+        forward(window)
+
+    latencies = []
+    start = time.perf_counter()
+    for window in windows:
+        call_start = time.perf_counter()
+        forward(window)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), len(windows) / elapsed
+
+
+def benchmark(num_threads : int = 2, n_calls : int = 200):
+    model = build_model(INPUT_STEPS, HORIZON_STEPS, N_FEATURES, N_FEATURES)
+    windows = np.random.default_rng(0).random((n_calls, INPUT_STEPS, N_FEATURES), dtype=np.float32)
+
+    engines = {'keras predict': lambda window: model.predict(window[np.newaxis], verbose=0)[0],
+               'keras call': lambda window: model(window[np.newaxis], training=False).numpy()[0]}
+    reference = engines['keras call'](windows[0])
+
+    for quantize in (False, True):
+        engine = InferenceEngine(model, INPUT_STEPS, N_FEATURES, quantize=quantize, num_threads=num_threads)
+        name = f"{engine.kind}{' quantized' if quantize else ''}"
+        size = f"{len(engine.artifact) / 2**20:.1f} MB" if engine.artifact is not None else '-'
+        error = np.abs(engine(windows[0]) - reference).max()
+        print(f"{name}: artifact {size}, max abs difference from keras {error:.2e}")
+        engines[name] = engine
+
+    print(f"\n{n_calls} forecasts, {num_threads} interpreter threads")
+    print(f"{'engine':<28}{'p50 (ms)':>10}{'p95 (ms)':>10}{'per second':>12}")
+    for name, forward in engines.items():
+        p50, p95, throughput = measure(forward, windows)
+        print(f"{name:<28}{p50:>10.2f}{p95:>10.2f}{throughput:>12.1f}")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2)
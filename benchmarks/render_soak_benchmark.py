@@ -0,0 +1,56 @@
+# Renders the same graphs many times through the render pool and follows the resident memory of the process:
+# it must stop growing once the first renders warmed up the caches of matplotlib and seaborn.
+# Run from the repository root: python -m benchmarks.render_soak_benchmark [n_renders] [max_growth_mb]
+# With max_growth_mb it exits with 1 if the memory grew more than that after the first tenth of the renders.
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+from web_service.classes.graphs.boxplot import Boxplot
+from web_service.classes.graphs.histogram import Histogram
+from web_service.classes.graphs.lineplot import LinePlot
+from web_service.classes.graphs.scatterplot import ScatterPlot
+from web_service.classes.graphs.summaries import histogram_summary, box_summary
+from web_service.classes.graphs.rendering import RenderPool
+
+VALUES = list(np.random.default_rng(0).normal(15, 5, 1000))
+DATES = [datetime(2023, 1, 1) + timedelta(minutes=i) for i in range(1000)]
+
+GRAPHS = [lambda: Boxplot(box_summary(VALUES), 'temp_c', (4, 3)).plot_graph(),
+          lambda: Histogram(histogram_summary(VALUES), 'temp_c', (4, 3)).plot_graph(),
+          lambda: ScatterPlot(VALUES, VALUES[::-1], 'temp_c', 'humidity', (4, 3)).plot_graph(),
+          lambda: LinePlot(VALUES, DATES, 'temp_c', 'ts', figsize=(4, 3)).plot_graph()]
+
+
+def rss_mb():
+    # current resident memory, /proc is linux only
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def benchmark(n_renders : int = 10_000, max_growth_mb : float = None, clients : int = 4):
+    pool = RenderPool()
+    step = max(n_renders // 10, 1)
+    print(f"{'renders':>8}{'RSS (MB)':>10}{'renders/s':>11}")
+
+    warm = None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as requests:
+        for done in range(step, n_renders + 1, step):
+            for batch in range(done - step, done, 100):    # the pngs of a batch are kept until it ends
+                list(requests.map(lambda i: pool.render(GRAPHS[i % len(GRAPHS)]), range(batch, min(batch + 100, done))))
+            rss = rss_mb()
+            warm = rss if warm is None else warm
+            print(f"{done:>8}{rss:>10.1f}{done / (time.perf_counter() - start):>11.1f}")
+
+    growth = rss_mb() - warm
+    print(f"growth after the first {step} renders: {growth:.1f} MB")
+    return max_growth_mb is not None and growth > max_growth_mb
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    sys.exit(1 if benchmark(n, float(sys.argv[2]) if len(sys.argv) > 2 else None) else 0)
@@ -0,0 +1,52 @@
+# Import time and memory of the web service modules, each imported in a fresh interpreter.
+# Run from the repository root: python -m benchmarks.startup_benchmark [max_seconds]
+# With max_seconds it exits with 1 if importing the station classes takes longer or loads tensorflow.
+
+import json
+import subprocess
+import sys
+
+MODULES = ['web_service.classes.weather_station.weather_station',    # what every blueprint imports
+           'web_service.classes.time_series.forecaster']              # loaded with the first model
+
+PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(__import__('json').dumps({{'seconds': elapsed, 'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                                 'tensorflow': 'tensorflow' in sys.modules}}))
+"""
+
+
+def measure(module : str, repeat : int = 3):
+    # best of repeat runs, None if the module cannot be imported here
+    runs = []
+    for _ in range(repeat):
+        probe = subprocess.run([sys.executable, '-c', PROBE.format(module=module)], capture_output=True, text=True)
+        if probe.returncode != 0:
+            return None
+        runs.append(json.loads(probe.stdout.strip().splitlines()[-1]))
+
+    return min(runs, key=lambda run: run['seconds'])
+
+
+def benchmark(max_seconds : float = None):
+    print(f"{'module':<55}{'seconds':>10}{'RSS (MB)':>10}{'tensorflow':>12}")
+    failed = False
+
+    for module in MODULES:
+        result = measure(module)
+        if result is None:
+            print(f"{module:<55}{'not importable here':>32}")
+            continue
+
+        print(f"{module:<55}{result['seconds']:>10.3f}{result['max_rss_mb']:>10.1f}{str(result['tensorflow']):>12}")
+        if module == MODULES[0] and max_seconds is not None:
+            failed = failed or result['tensorflow'] or result['seconds'] > max_seconds
+
+    return failed
+
+
+if __name__ == '__main__':
+    sys.exit(1 if benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else None) else 0)
@@ -0,0 +1,91 @@
+# Compares the Statistics (python) and NumpyStatistics backends on the same data: first the reductions alone, then
+# the whole path of a request, from the mongo query to the statistics (_get_feature_array against
+# _get_feature_column, with the mongo aggregation for reference). The second part needs mongo, it fills a scratch
+# station collection and drops it at the end.
+# Run from the repository root: python -m benchmarks.statistics_benchmark [n_samples]
+
+import sys
+from datetime import datetime, timedelta
+from timeit import timeit
+import numpy as np
+from pymongo.errors import PyMongoError
+from web_service.classes.statistics.statistics import Statistics
+from web_service.classes.statistics.numpy_statistics import NumpyStatistics
+from web_service.classes.statistics.rollups import Rollups
+from web_service.classes.statistics.statistics_backend import StatBackend
+
+SCRATCH = 'station_benchmark'
+
+
+def reductions(column : np.ndarray, repeat : int):
+    values = column.tolist()                          # what _get_feature_array returns
+
+    print(f"reductions, best of {repeat} runs (seconds)")
+    print(f"{'statistic':<10}{'python':>12}{'numpy':>12}{'speedup':>10}")
+
+    for name in ['mean', 'max', 'min', 'std']:
+        python_f = getattr(Statistics, f'get_{name}')
+        numpy_f = getattr(NumpyStatistics, f'get_{name}')
+
+        python_t = min(timeit(lambda: python_f(values), number=1) for _ in range(repeat))
+        numpy_t = min(timeit(lambda: numpy_f(column), number=1) for _ in range(repeat))
+
+        assert round(python_f(values), 6) == round(numpy_f(column), 6)
+        print(f"{name:<10}{python_t:>12.4f}{numpy_t:>12.4f}{python_t / numpy_t:>9.1f}x")
+
+
+def full_path(column : np.ndarray, repeat : int):
+    from web_service.mongo.connect import db
+    from web_service.classes.weather_station.weather_station_data import WeatherData, find_numpy_all
+
+    try:
+        db.command('ping')
+    except PyMongoError as e:
+        print(f"mongo not reachable, the whole path is not measured: {e}")
+        return
+
+    collection = db[SCRATCH]
+    collection.drop()
+    start = datetime(2023, 1, 1)
+    samples = [{'ts': start + timedelta(minutes=i), 'temp_c': float(value)} for i, value in enumerate(column)]
+    for i in range(0, len(samples), 100_000):
+        collection.insert_many(samples[i:i + 100_000], ordered=False)
+
+    try:
+        data = WeatherData(collection, StatBackend.PYTHON)
+        print(f"\nfrom the query to the statistics, best of {repeat} runs (seconds)"
+              f"{', columns decoded by pymongoarrow' if find_numpy_all is not None else ''}")
+        print(f"{'backend':<10}{'fetch':>12}{'all stats':>12}")
+
+        fetches = {StatBackend.PYTHON: lambda: data._get_feature_array('temp_c'),
+                   StatBackend.NUMPY: lambda: data._get_feature_column('temp_c'),
+                   StatBackend.MONGO: None}
+        results = {}
+        for backend, fetch in fetches.items():
+            data.stat_backend = backend
+            fetch_t = min(timeit(fetch, number=1) for _ in range(repeat)) if fetch else None
+            stats_t = min(timeit(lambda: data.all_statistics(['temp_c']), number=1) for _ in range(repeat))
+            results[backend] = data.all_statistics(['temp_c'])['temp_c']
+
+            fetch_column = f"{fetch_t:>12.4f}" if fetch_t is not None else f"{'-':>12}"
+            print(f"{backend.name.lower():<10}{fetch_column}{stats_t:>12.4f}")
+
+        reference = results[StatBackend.PYTHON]
+        assert all(round(result[name], 6) == round(reference[name], 6)
+                   for result in results.values() for name in reference)
+    finally:
+        for name in [SCRATCH] + [f'{SCRATCH}_{granularity}' for granularity in Rollups.GRANULARITIES]:
+            db.drop_collection(name)
+
+
+def benchmark(n_samples : int = 1_000_000, repeat : int = 3):
+    rng = np.random.default_rng(0)
+    column = rng.normal(15, 5, n_samples).round(2)   # temperature-like values
+
+    print(f"{n_samples} samples")
+    reductions(column, repeat)
+    full_path(column, repeat)
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
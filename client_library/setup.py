@@ -9,4 +9,5 @@ setup(name='SkyScribe',
       package_dir={"" : "."},
       packages= find_packages(),
       install_requires=['pandas','requests'],
+      extras_require={'arrow': ['pyarrow'], 'plot': ['matplotlib']},
       python_requires=">=3.10")
\ No newline at end of file
@@ -1,6 +1,7 @@
 import requests
+import time
 from typing import Dict, List
-from .exceptions import NotTrainedError
+from .exceptions import NotTrainedError, NotFoundError, BadRequestError
 from pandas import DataFrame
 from .utils.config import URL_BASELINE
 from .utils.cl_helper_functions import weather_json_to_oop,weather_json_to_dataframe
@@ -20,6 +21,7 @@ class Forecaster:
         self.__id = model_id
         self.__station = station_id
         self.__trained = False
+        self.__job = None
 
     def __str__(self):
         """
@@ -42,22 +44,92 @@ class Forecaster:
     def _update_id(self, new_id : int):
         self.__id = new_id
 
-    def train(self, epochs : int = 5, batch_size : int = 32):
+    def train(self, epochs : int = 5, batch_size : int = 32, streaming : bool = False, shuffle_buffer : int = 1024,
+              wait : bool = True, poll_interval : float = 2.0):
         """
-        Used to prepare the model for predictions. It might take some time.
+        Used to prepare the model for predictions. The training runs on the server in the background.
         :param epochs: Epochs the model should train for (NOTE: Early Stopping will stop the process if convenient).
         :param batch_size: Size of the training batches. Usually smaller batches lead to longer training times and better results.
-        :return: None. Prints a confirmation of training at the end.
-        :rtype: None
+        :param streaming: Whether the server should build the training windows lazily while training. Keeps the memory used by long station histories bounded.
+        :param shuffle_buffer: Number of windows shuffled together when `streaming` is True.
+        :param wait: Whether to block until the training is over. If False the job ID is returned and `training_status()` reports the progress.
+        :param poll_interval: Seconds between two checks of the training progress when `wait` is True.
+        :return: None if `wait` is True, printing a confirmation of training at the end. Otherwise the job ID.
+        :rtype: Union[None,str]
         """
-        body = locals()
-        body.pop('self')
+        body = {'epochs' : epochs, 'batch_size' : batch_size, 'streaming' : streaming, 'shuffle_buffer' : shuffle_buffer}
         request = requests.post(f"{URL_BASELINE}/stations/{self.station_id}/forecast/models/{self.__id}/train", json=body)
-        if request.status_code == 200:
-            self.__trained = True
-            print(f"Model {self.id} of station {self.station_id} is ready for predictions")
+
+        if request.status_code == 409:
+            raise BadRequestError(request.json()['error'])
+        if request.status_code != 202:
+            return
+
+        self.__trained = False
+        self.__job = request.json()['job']
+        if not wait:
+            return self.__job
+
+        self._wait_job(poll_interval)
+        print(f"Model {self.id} of station {self.station_id} is ready for predictions")
+
+    def fine_tune(self, epochs : int = 3, batch_size : int = 32, wait : bool = True, poll_interval : float = 2.0):
+        """
+        Updates a trained model with the samples added to the station since its last training.
+        The weights and the normalization of the data are kept, only a few epochs are run on the new samples.
+        :param epochs: Epochs the model should train for on the new samples.
+        :param batch_size: Size of the training batches.
+        :param wait: Whether to block until the fine tuning is over. If False the job ID is returned and `training_status()` reports the progress.
+        :param poll_interval: Seconds between two checks of the progress when `wait` is True.
+        :return: None if `wait` is True. Otherwise the job ID.
+        :rtype: Union[None,str]
+        """
+        body = {'epochs' : epochs, 'batch_size' : batch_size}
+        request = requests.post(f"{URL_BASELINE}/stations/{self.station_id}/forecast/models/{self.__id}/fine-tune", json=body)
+
+        if request.status_code in (400, 409):
+            raise BadRequestError(request.json()['error'])
+        if request.status_code != 202:
             return
 
+        self.__job = request.json()['job']
+        if not wait:
+            return self.__job
+
+        self._wait_job(poll_interval)
+        print(f"Model {self.id} of station {self.station_id} was updated with the new samples")
+
+    def _wait_job(self, poll_interval : float):
+        status = self.training_status()
+        while status['status'] in ('queued', 'running'):
+            time.sleep(poll_interval)
+            status = self.training_status()
+
+        if status['status'] == 'failed':
+            raise BadRequestError(f"Training of model {self.id} of station {self.station_id} failed: {status.get('error')}")
+
+    def training_status(self, job_id : str = None):
+        """
+        Reports the progress of a training started with `train()`.
+
+        :param job_id: ID of the training job. If None the last job started by this object is used.
+        :return: Dictionary with the status of the job ('queued', 'running', 'done' or 'failed'), the last finished epoch, its loss and the epochs requested.
+        :rtype: Dict
+        """
+        if job_id is None:
+            job_id = self.__job
+        if job_id is None:
+            raise NotFoundError(f"Model {self.id} of station {self.station_id} has no training job.")
+
+        request = requests.get(f"{URL_BASELINE}/stations/{self.station_id}/forecast/jobs/{job_id}")
+        if request.status_code == 404:
+            raise NotFoundError(f"Training job {job_id} not found.")
+
+        status = request.json()
+        if job_id == self.__job and status['status'] == 'done':
+            self.__trained = True
+        return status
+
     def forecast(self, as_dataframe : bool = False, as_dict : bool = False):
         """
         Used to get the predictions. If `as_dataframe` and `as_dict` parameters are left None, the result will be a list of `Sample` objects.
@@ -67,6 +139,8 @@ class Forecaster:
         :return: horizon_steps predictions according to the model output_fields.
         :rtype: List[Sample,Dict,DataFrame]
         """
+        if not self.__trained and self.__job is not None:
+            self.training_status()
         if not self.__trained:
             raise NotTrainedError(f"Model {self.id} of station {self.station_id} has not been trained yet!"
                                   f"Please execute model.train() first.")
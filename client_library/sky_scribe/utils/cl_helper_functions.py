@@ -1,19 +1,46 @@
 from typing import List,Dict,Union
 from ..sample import Sample
-from pandas import DataFrame
+from pandas import DataFrame, to_datetime
 from datetime import datetime
 
+try:    # optional, enables the columnar transfer of samples (pip install SkyScribe[arrow])
+    import pyarrow as pa
+except ImportError:
+    pa = None
 
-def weather_json_to_dataframe(data : Union[List[Dict], Dict], idx : str = None):
+
+def weather_json_to_dataframe(data : Union[List[Dict], Dict], idx : str = None, parse_ts : bool = False):
     if type(data) == dict:
         res=DataFrame([data])
     else:
         res=DataFrame(data)
+    if parse_ts and 'ts' in res.columns:
+        res['ts'] = parse_json_dates(res['ts'])
     if idx is not None:
         res.set_index(idx,inplace=True)
     return res
 
 
+def parse_json_dates(dates):
+    # the server sends the dates as 'Sun, 12 Nov 2023 18:02:00 GMT', this gives the same dtype as the arrow format
+    return to_datetime(dates, format='%a, %d %b %Y %H:%M:%S GMT')
+
+
+def arrow_available():
+    return pa is not None
+
+
+def weather_arrow_to_dataframe(content : bytes, idx : str = None):
+    # the buffer is wrapped without copying and split_blocks lets numeric columns without missing values
+    # become views over the arrow memory instead of being consolidated into new arrays
+    table = pa.ipc.open_stream(pa.py_buffer(content)).read_all()
+    res = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    if idx is not None and idx in res.columns:
+        res.set_index(idx, inplace=True)
+    return res
+
+
 def weather_json_to_oop(data : Union[List[Dict], Dict]):
     if type(data) == dict:
         return Sample(data['ts'], **data)
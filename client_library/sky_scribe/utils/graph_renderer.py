@@ -0,0 +1,73 @@
+from typing import Dict
+from datetime import datetime
+
+try:    # optional, draws the graphs locally from the data sent by the server (pip install SkyScribe[plot])
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+except ImportError:
+    Figure = None
+
+
+def matplotlib_available():
+    return Figure is not None
+
+
+def _values(values):
+    # null stands for a missing value
+    return [float('nan') if value is None else value for value in values]
+
+
+def draw_graph(data : Dict, figsize=(10, 10)) -> Figure:
+    # data is what /graphs/<type>/<pin>?format=json returns, drawn as the server draws it
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    pins = data['pins']
+
+    if data['type'] == 'boxplot':
+        box = data['boxplot']
+        if box['n']:
+            ax.bxp([dict(box, label=pins[0])], patch_artist=True, boxprops={'facecolor': 'tab:blue'},
+                   medianprops={'color': 'black'})
+        ax.set_title(f"Box plot of: {pins[0]}")
+        ax.set_ylabel(pins[0])
+
+    elif data['type'] == 'histogram':
+        hist = data['histogram']
+        if hist['n']:
+            ax.stairs(hist['counts'], hist['edges'], fill=True, alpha=0.5, color='tab:blue')
+            ax.stairs(hist['counts'], hist['edges'], color='tab:blue')
+            ax.plot(hist['kde_x'], hist['kde_y'], color='tab:blue')
+        ax.set_title(f"Histogram of: {pins[0]}")
+        ax.set_xlabel(pins[0])
+        ax.set_ylabel("Count")
+
+    elif data['type'] == 'scatterplot':
+        ax.scatter(_values(data['x']), _values(data['y']), s=15)
+        ax.set_title(f"Scatter plot of: {pins[0]} and {pins[1]}")
+        ax.set_xlabel(pins[0])
+        ax.set_ylabel(pins[1])
+
+    elif data['type'] == 'lineplot':
+        ts = [datetime.fromisoformat(el) for el in data['ts']]
+        lines = ax.plot(ts, _values(data['series'][pins[0]]), label=pins[0])
+        ax.set_xlabel('Time')
+        ax.set_ylabel(pins[0])
+
+        if len(pins) > 1:
+            ax2 = ax.twinx()
+            lines += ax2.plot(ts, _values(data['series'][pins[1]]), label=pins[1], color='tab:orange')
+            ax2.set_ylabel(pins[1])
+            ax.legend(lines, [el.get_label() for el in lines], loc='upper left')
+            ax.set_title(f"Line plot of: {pins[0]} and {pins[1]}")
+        else:
+            ax.set_title(f"line plot of: {pins[0]}")
+
+    return fig
+
+
+def save_graph(data : Dict, file_path : str, figsize=(10, 10)):
+    # png, as the images sent by the server
+    fig = draw_graph(data, figsize)
+    FigureCanvasAgg(fig)
+    fig.savefig(file_path, format='png')
+    fig.clear()
@@ -1,10 +1,13 @@
 import requests
+import json
 from datetime import datetime
-from typing import Dict, List,Union,Tuple,Any
+from typing import Dict, List,Union,Tuple,Any,Iterator
 from .exceptions import *
 from pandas import DataFrame
 from .sample import Sample
 from .utils.cl_helper_functions import weather_json_to_oop,weather_json_to_dataframe,build_date
+from .utils.cl_helper_functions import arrow_available, weather_arrow_to_dataframe
+from .utils.graph_renderer import matplotlib_available, save_graph
 from .utils.config import URL_BASELINE
 from .forecaster import Forecaster
 
@@ -62,7 +65,7 @@ class WeatherStation:
         :rtype: List[Union[Sample,Dict,DataFrame]]
         """
 
-        result = requests.get(f"{URL_BASELINE}/stations/{self.id}/samples/").json()
+        result = list(self.iter_samples(as_dict=True))
         if not as_dict and not as_dataframe:
             result = weather_json_to_oop(result)
 
@@ -71,6 +74,67 @@ class WeatherStation:
 
         return result
 
+    @staticmethod
+    def _filter_params(filters : Dict[str, Tuple[Union[float,None], Union[float,None]]]) -> List[Tuple[str,str]]:
+        params = []
+        for field, range_ in filters.items():
+            lower, upper = range_
+            if lower is not None:
+                params.append((field, f">={lower}"))
+            if upper is not None:
+                params.append((field, f"<={upper}"))
+        return params
+
+    def iter_samples(self, prebuilt_date_1 : datetime = None, prebuilt_date_2 : datetime = None, page_size : int = 10000,
+                     as_dataframe : bool = False, as_dict : bool = False,
+                     **filters : Tuple[Union[float,None], Union[float,None]]) -> Iterator[Union[Sample,Dict,DataFrame]]:
+        """
+        Lazily iterates over the samples of the station, sorted by date. The samples are requested one page at a time,
+        so neither the server nor the client needs to hold the complete history in memory.
+        One can restrict the iteration to a date range (both dates must be given) or filter the fields like in `get_filtered_samples()`, not both.
+
+        :param prebuilt_date_1: Starting date of the range.
+        :type prebuilt_date_1: datetime
+        :param prebuilt_date_2: Ending date of the range.
+        :type prebuilt_date_2: datetime
+        :param page_size: Number of samples requested at a time.
+        :param as_dataframe: Whether to yield each page as a pandas DataFrame instead of single samples.
+        :param as_dict: Whether to yield the samples as python dictionaries.
+        :param filters: Keyword arguments that specify the minimum and maximum values of the field. The syntax is <field>=[<min>,<max>]
+        :return: Iterator over the samples (or the pages if `as_dataframe` is True).
+        :rtype: Iterator[Union[Sample,Dict,DataFrame]]
+        """
+        if (prebuilt_date_1 is None) != (prebuilt_date_2 is None):
+            raise BadRequestError('Both dates of the range must be provided.')
+        if prebuilt_date_1 is not None and filters:
+            raise BadRequestError('Samples can be filtered either by date range or by field values, not both.')
+
+        url = f"{URL_BASELINE}/stations/{self.id}/samples/"
+        if prebuilt_date_1 is not None:
+            url += f"{prebuilt_date_1.strftime('%Y-%m-%d %H:%M:%S')}/{prebuilt_date_2.strftime('%Y-%m-%d %H:%M:%S')}"
+
+        params = self._filter_params(filters) + [('limit', page_size)]
+        after = None
+
+        while True:
+            page_params = params if after is None else params + [('after', after)]
+            request = requests.get(url, params=page_params)
+            if request.status_code != 200:
+                raise NotFoundError(f'Samples of station {self.id} not found.')
+
+            page = request.json()
+            if page:
+                if as_dataframe:
+                    yield weather_json_to_dataframe(page, 'ts')
+                elif as_dict:
+                    yield from page
+                else:
+                    yield from weather_json_to_oop(page)
+
+            after = request.headers.get('X-Next-After')
+            if after is None:
+                return
+
     def get_one_sample(self, year : int = 2023, month : int = 11, day : int = 1, hour : int = 1, minute : int = 1,
                        prebuilt_date : datetime = None, as_dataframe : bool = False, as_dict : bool = False) -> Union[Sample,Dict,DataFrame]:
         """
@@ -114,7 +178,8 @@ class WeatherStation:
     def get_range_of_samples(self, year_1 : int = None, month_1 : int = None, day_1 : int = None, hour_1 : int = None, minute_1 : int = None,
                           year_2: int = None, month_2: int = None, day_2: int = None, hour_2: int = None, minute_2: int = None,
                           prebuilt_date_1: datetime = None, prebuilt_date_2 : datetime = None,
-                                as_dataframe : bool = False, as_dict : bool = False) -> List[Union[Sample,Dict,DataFrame]]:
+                                as_dataframe : bool = False, as_dict : bool = False,
+                                stream : bool = False) -> Union[List[Union[Sample,Dict]],DataFrame,Iterator[Union[Sample,Dict]]]:
 
         """
         Behave similarly to `get_all_samples()` with the difference that we can specify two dates, the starting date and the ending date.
@@ -135,10 +200,11 @@ class WeatherStation:
         :type prebuilt_date_1: datetime
         :param prebuilt_date_2: Ending date passed instead of specifying each field.
         :type prebuilt_date_2: datetime
-        :param as_dataframe: Whether to return the data in a pandas DataFrame.
+        :param as_dataframe: Whether to return the data in a pandas DataFrame. If pyarrow is installed the samples are transferred in the Arrow columnar format and decoded without going through JSON. In both cases the index is a datetime column.
         :param as_dict: Whether to return the data as python dictionaries.
+        :param stream: Whether to receive the samples while the server reads them. An iterator is returned instead of a list, so the samples can be processed before the whole range has arrived. With `as_dataframe` the DataFrame is built directly from the stream.
         :return: List of all samples in the station taken within the specified range.
-        :rtype: List[Union[Sample,Dict,DataFrame]]
+        :rtype: Union[List[Union[Sample,Dict]],DataFrame,Iterator[Union[Sample,Dict]]]
         """
         if not year_1 and not prebuilt_date_1:
             date1 = self._str_to_date(requests.get(f"{URL_BASELINE}/stations/{self.id}/samples/0").text)
@@ -154,6 +220,20 @@ class WeatherStation:
         else:
             date2 = build_date(year_2, month_2, day_2, hour_2, minute_2).strftime('%Y-%m-%d %H:%M:%S')
 
+        if stream:
+            samples = self._stream_samples(f"{URL_BASELINE}/stations/{self.id}/samples/{date1}/{date2}")
+            if as_dataframe:
+                return weather_json_to_dataframe(list(samples), 'ts', parse_ts=True)
+            if as_dict:
+                return samples
+            return (weather_json_to_oop(el) for el in samples)
+
+        if as_dataframe and arrow_available():
+            request = requests.get(f"{URL_BASELINE}/stations/{self.id}/samples/{date1}/{date2}", params={'format': 'arrow'})
+            if request.status_code == 200:
+                return weather_arrow_to_dataframe(request.content, 'ts')
+            # 501: the server can't produce arrow, use JSON
+
         request = requests.get(f"{URL_BASELINE}/stations/{self.id}/samples/{date1}/{date2}")
 
         if request.status_code == 200:
@@ -161,9 +241,18 @@ class WeatherStation:
             if not as_dict and not as_dataframe:
                 result = weather_json_to_oop(result)
             if as_dataframe:
-                result = weather_json_to_dataframe(result, 'ts')
+                result = weather_json_to_dataframe(result, 'ts', parse_ts=True)   # same index as the arrow path
             return result
 
+    def _stream_samples(self, url : str) -> Iterator[Dict]:
+        with requests.get(url, params={'format': 'ndjson'}, stream=True) as request:
+            if request.status_code != 200:
+                raise NotFoundError(f'Samples of station {self.id} not found.')
+
+            for line in request.iter_lines():
+                if line:
+                    yield json.loads(line)
+
     def get_filtered_samples(self, as_dataframe : bool = False, as_dict : bool = False
                              , **filters : Tuple[Union[float,None], Union[float,None]]) -> List[Union[Sample,Dict,DataFrame]]:
         """
@@ -179,21 +268,7 @@ class WeatherStation:
         :rtype: List[Union[Sample,Dict,DataFrame]]
         """
 
-        query_string = "?"
-        for field, range_ in filters.items():
-            lower, upper = range_
-            if lower is not None:      # >= in percent encoding
-                query_string+=f"{field}=%3E%3D{lower}"
-
-            if upper is not None:
-                if lower is not None:
-                    query_string += '&'  # <= in percent encoding
-                query_string+=f"{field}=%3C%3D{upper}"
-
-            if lower is not None or upper is not None:
-                query_string+='&'
-        query_string = query_string[:-1]
-        request = requests.get(f"{URL_BASELINE}/stations/{self.id}/samples/{query_string}")
+        request = requests.get(f"{URL_BASELINE}/stations/{self.id}/samples/", params=self._filter_params(filters))
 
         if request.status_code == 200:
             result = request.json()
@@ -611,37 +686,48 @@ class WeatherStation:
 
     # GRAPHS
 
-    def _plot(self,graph_type : str ,field : str, file_path : str, field_2 : str = None):
+    def _plot(self,graph_type : str ,field : str, file_path : str, field_2 : str = None, local : bool = False):
+        # local: the server sends the (downsampled or summarized) data and the graph is drawn here
+        if local and not matplotlib_available():
+            raise ImportError('Drawing the graphs locally requires matplotlib (pip install SkyScribe[plot])')
+
         fields_input = f"{field}" if field_2 is None else f"{field}/{field_2}"
-        request = requests.get(f"{URL_BASELINE}/stations/{self.id}/graphs/{graph_type}/{fields_input}")
+        request = requests.get(f"{URL_BASELINE}/stations/{self.id}/graphs/{graph_type}/{fields_input}",
+                               params={'format': 'json'} if local else None)
         if request.status_code == 200:
-            with open(f"{file_path}/{graph_type}_of_{fields_input.replace('/','-')}.jpg", 'wb') as f:
+            image_path = f"{file_path}/{graph_type}_of_{fields_input.replace('/','-')}.jpg"
+            if local:
+                save_graph(request.json(), image_path)
+                return
+            with open(image_path, 'wb') as f:
                 f.write(request.content)
         elif request.status_code == 404:
             raise NotFoundError(f'Field "{field} not found."')
 
-    def boxplot(self, field :  str, file_path : str):
+    def boxplot(self, field :  str, file_path : str, local : bool = False):
         """
         Plots a boxplot of the specified field using the Seaborn library. It then creates a .jpg file in the `file_path` to access the graph.
 
         :param field: Field of choice.
         :param file_path: Path where the image will be saved.
+        :param local: Whether to draw the graph with the local matplotlib from the data sent by the server, instead of receiving the image. Requires matplotlib.
         :rtype: None
         """
 
-        self._plot('boxplot',field, file_path)
+        self._plot('boxplot',field, file_path, local=local)
 
-    def histogram(self, field: str, file_path: str):
+    def histogram(self, field: str, file_path: str, local : bool = False):
         """
         Plots a histogram of the specified field using the Seaborn library. It then creates a .jpg file in the `file_path` to access the graph.
 
         :param field: Field of choice.
         :param file_path: Path where the image will be saved.
+        :param local: Whether to draw the graph with the local matplotlib from the data sent by the server, instead of receiving the image. Requires matplotlib.
         :rtype: None
         """
-        self._plot('histogram', field, file_path)
+        self._plot('histogram', field, file_path, local=local)
 
-    def scatterplot(self, field_1 : str, field_2 : str, file_path : str):
+    def scatterplot(self, field_1 : str, field_2 : str, file_path : str, local : bool = False):
         """
         Plots a scatterplot of the specified fields using the Seaborn library. It then creates a .jpg file in the `file_path` to access the graph.
         `field_1` and `field_2` must be provided.
@@ -649,11 +735,12 @@ class WeatherStation:
         :param field_1: First field of choice. Will be associated to the X-axis.
         :param field_2: Second field of choice. Will be associated to the Y-axis.
         :param file_path: Path where the image will be saved.
+        :param local: Whether to draw the graph with the local matplotlib from the data sent by the server, instead of receiving the image. Requires matplotlib.
         :rtype: None
         """
-        self._plot('scatterplot', field_1,file_path,field_2)
+        self._plot('scatterplot', field_1,file_path,field_2, local)
 
-    def lineplot(self,file_path : str, field_1 : str, field_2 : str = None):
+    def lineplot(self,file_path : str, field_1 : str, field_2 : str = None, local : bool = False):
         """
         Plots a boxplot of the specified field(s) using the Seaborn library. It then creates a .jpg file in the `file_path` to access the graph.
         `field_1` must be always provided. If `field_2` isn't provided only one line will be plotted.
@@ -661,12 +748,13 @@ class WeatherStation:
         :param field_1: First field of choice.
         :param field_2: Second field of choice. If provided will be plotted as a second line.
         :param file_path: Path where the image will be saved.
+        :param local: Whether to draw the graph with the local matplotlib from the data sent by the server, instead of receiving the image. Requires matplotlib.
         :rtype: None
         """
         if field_2 is None:
-            self._plot('lineplot',field_1,file_path)
+            self._plot('lineplot',field_1,file_path, local=local)
         else:
-            self._plot('lineplot', field_1,file_path,field_2)
+            self._plot('lineplot', field_1,file_path,field_2, local)
 
     # FORECASTING
 
@@ -0,0 +1,34 @@
+from client_library.sky_scribe.utils.graph_renderer import draw_graph, save_graph
+from web_service.classes.graphs.summaries import histogram_summary, box_summary
+from datetime import datetime, timedelta
+import json
+import numpy as np
+import pytest
+
+VALUES = np.random.default_rng(0).normal(15, 5, 500)
+TS = [(datetime(2023, 1, 1) + timedelta(minutes=i)).isoformat() for i in range(500)]
+
+# as /graphs/<type>/<pin>?format=json sends them
+DATA = [{'type': 'boxplot', 'pins': ['temp_c'], 'boxplot': box_summary(VALUES)},
+        {'type': 'histogram', 'pins': ['temp_c'], 'histogram': histogram_summary(VALUES)},
+        {'type': 'scatterplot', 'pins': ['temp_c', 'humidity'], 'x': VALUES.tolist(), 'y': [None] + VALUES[1:].tolist()},
+        {'type': 'lineplot', 'pins': ['temp_c'], 'ts': TS, 'series': {'temp_c': VALUES.tolist()}},
+        {'type': 'lineplot', 'pins': ['temp_c', 'humidity'], 'ts': TS,
+         'series': {'temp_c': VALUES.tolist(), 'humidity': VALUES[::-1].tolist()}}]
+
+
+TITLES = {'boxplot': 'box plot', 'histogram': 'histogram', 'scatterplot': 'scatter plot', 'lineplot': 'line plot'}
+
+
+@pytest.mark.parametrize('data', DATA)
+def test_draw_graph(data):
+    fig = draw_graph(json.loads(json.dumps(data)), (4, 3))
+
+    assert fig.axes[0].get_title().lower().startswith(TITLES[data['type']]) and fig.axes[0].has_data()
+    assert len(fig.axes) == (2 if len(data.get('series', ())) == 2 else 1)
+
+
+def test_save_graph(tmp_path):
+    save_graph(DATA[0], str(tmp_path / 'boxplot_of_temp_c.jpg'), (4, 3))
+
+    assert (tmp_path / 'boxplot_of_temp_c.jpg').read_bytes().startswith(b'\x89PNG')
@@ -0,0 +1,51 @@
+from client_library.sky_scribe.utils.cl_helper_functions import weather_arrow_to_dataframe, weather_json_to_dataframe
+from web_service.utils.columnar_export import cursor_to_table, table_to_bytes
+from pandas import DataFrame
+from datetime import datetime
+
+
+samples = [{'ts': datetime(2023, 11, 12, 18, 2), 'temp_c': 12.5, 'humidity': 80},
+           {'ts': datetime(2023, 11, 12, 18, 3), 'temp_c': 12.4, 'humidity': 81}]
+
+
+def test_weather_arrow_to_dataframe_0():
+    content = table_to_bytes(cursor_to_table(samples), 'arrow')
+    result = weather_arrow_to_dataframe(content)
+
+    assert result.equals(DataFrame(samples))
+
+
+def test_weather_arrow_to_dataframe_1():
+    content = table_to_bytes(cursor_to_table(samples), 'arrow')
+    result = weather_arrow_to_dataframe(content, idx='ts')
+
+    df = DataFrame(samples)
+    df.set_index('ts', inplace=True)
+
+    assert result.equals(df)
+
+
+def test_weather_arrow_to_dataframe_2():
+    content = table_to_bytes(cursor_to_table([]), 'arrow')
+    result = weather_arrow_to_dataframe(content, idx='ts')
+
+    assert result.empty
+
+
+def test_weather_arrow_to_dataframe_3():
+    mixed = samples + [{'ts': datetime(2023, 11, 12, 18, 4), 'temp_c': 12, 'rssi': -2}]
+    content = table_to_bytes(cursor_to_table(mixed, batch_size=2), 'arrow')
+    result = weather_arrow_to_dataframe(content, idx='ts')
+
+    assert list(result['temp_c']) == [12.5, 12.4, 12.0] and result['rssi'].isna().sum() == 2
+
+
+def test_weather_arrow_to_dataframe_json_index():
+    # the JSON fallback of the client gives the same index
+    content = table_to_bytes(cursor_to_table(samples), 'arrow')
+    json_samples = [dict(el, ts=el['ts'].strftime('%a, %d %b %Y %H:%M:%S GMT')) for el in samples]
+
+    result = weather_json_to_dataframe(json_samples, 'ts', parse_ts=True)
+
+    assert result.equals(weather_arrow_to_dataframe(content, 'ts'))
+    assert result.index.dtype == weather_arrow_to_dataframe(content, 'ts').index.dtype
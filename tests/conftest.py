@@ -0,0 +1,20 @@
+import pytest
+
+
+# tests marked slow (soak tests running for minutes) only run with --slow
+
+def pytest_addoption(parser):
+    parser.addoption('--slow', action='store_true', default=False, help='also run the tests marked slow')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: runs for minutes, skipped without --slow')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--slow'):
+        return
+    skip = pytest.mark.skip(reason='slow, run with --slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,142 @@
+from web_service.classes.time_series import get_dataset
+from web_service.classes.time_series.get_dataset import DatasetCache
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Event
+import pandas as pd
+import pytest
+import time
+
+
+class FakeCollection:
+    # what _fetch reads: the samples of the station sorted by ts, restricted to ts > filter
+    def __init__(self, n):
+        self.samples = [{'ts': datetime(2023, 1, 1) + timedelta(minutes=i), 'temp_c': float(i), 'humidity': 50.0}
+                        for i in range(n)]
+        self.fetches = []
+
+    def fetch(self, station_id, which_fields, mongo_filter=None):
+        self.fetches.append(mongo_filter)
+        after = mongo_filter['ts']['$gt'] if mongo_filter else datetime.min
+        rows = [el for el in self.samples if el['ts'] > after]
+        if which_fields != 'all':
+            rows = [{key: el[key] for key in list(which_fields) + ['ts'] if key in el} for el in rows]
+        return pd.DataFrame(rows)
+
+
+class FakeWatermarks:
+    # the counters Watermarks keeps in mongo
+    def __init__(self):
+        self.counters = {}
+
+    def get(self, name):
+        return self.counters.get(name, (0, 0))
+
+    def appended(self, name):
+        generation, version = self.get(name)
+        self.counters[name] = (generation, version + 1)
+
+    def rewritten(self, name):
+        generation, version = self.get(name)
+        self.counters[name] = (generation + 1, version + 1)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection(10)
+    monkeypatch.setattr(get_dataset, '_fetch', collection.fetch)
+    return collection
+
+
+class TestDatasetCache:
+    name = 'station_0'
+
+    def setup_method(self):
+        self.marks = FakeWatermarks()
+
+    def test_hit(self, collection):
+        cache = DatasetCache(marks=self.marks)
+        first = cache.get(0)
+
+        assert cache.get(0) is first and len(collection.fetches) == 1 and len(first) == 10
+
+    def test_fields(self, collection):
+        cache = DatasetCache(marks=self.marks)
+        temp = cache.get(0, {'temp_c': 1})
+        cache.get(0, {'temp_c': 1, 'ts': 1})
+
+        assert list(temp.columns) == ['temp_c', 'ts'] and len(collection.fetches) == 1
+        assert list(cache.get(0).columns) == ['ts', 'temp_c', 'humidity'] and len(collection.fetches) == 2
+
+    def test_append(self, collection):
+        cache = DatasetCache(marks=self.marks)
+        cache.get(0)
+        collection.samples.append({'ts': datetime(2023, 1, 2), 'temp_c': 99.0, 'humidity': 1.0})
+        self.marks.appended(self.name)
+        frame = cache.get(0)
+
+        assert collection.fetches[-1] == {'ts': {'$gt': datetime(2023, 1, 1, 0, 9)}}
+        assert len(frame) == 11 and frame['temp_c'].iloc[-1] == 99.0 and list(frame.index) == list(range(11))
+
+    def test_rewrite(self, collection):
+        cache = DatasetCache(marks=self.marks)
+        cache.get(0)
+        collection.samples[0]['temp_c'] = -1.0
+        self.marks.rewritten(self.name)
+        frame = cache.get(0)
+
+        assert collection.fetches[-1] is None and frame['temp_c'].iloc[0] == -1.0
+
+    def test_lru(self, collection):
+        cache = DatasetCache(max_entries=2, marks=self.marks)
+        cache.get(0, {'temp_c': 1})
+        cache.get(0, {'humidity': 1})
+        cache.get(0, {'temp_c': 1})
+        cache.get(0)
+        cache.get(0, {'temp_c': 1})
+        cache.get(0, {'humidity': 1})
+
+        assert len(collection.fetches) == 4
+
+    def test_concurrent_misses(self, collection, monkeypatch):
+        # the callers missing the same key wait for a single fetch
+        fetch = collection.fetch
+
+        def slow_fetch(*args):
+            time.sleep(0.2)     # the other callers arrive meanwhile
+            return fetch(*args)
+
+        monkeypatch.setattr(get_dataset, '_fetch', slow_fetch)
+        cache = DatasetCache(marks=self.marks)
+        with ThreadPoolExecutor(4) as callers:
+            frames = list(callers.map(lambda _: cache.get(0), range(4)))
+
+        assert len(collection.fetches) == 1 and all(el is frames[0] for el in frames)
+
+    def test_fetch_outside_lock(self, collection, monkeypatch):
+        # a fetch does not block the callers of the other keys
+        fetch = collection.fetch
+        release = Event()
+
+        def blocked_fetch(station_id, which_fields, mongo_filter=None):
+            if which_fields == 'all':
+                release.wait(5)
+            return fetch(station_id, which_fields, mongo_filter)
+
+        monkeypatch.setattr(get_dataset, '_fetch', blocked_fetch)
+        cache = DatasetCache(marks=self.marks)
+        with ThreadPoolExecutor(1) as caller:
+            blocked = caller.submit(cache.get, 0)
+            temp = cache.get(0, {'temp_c': 1})
+            done_before = blocked.done()
+            release.set()
+
+        assert len(temp) == 10 and not done_before and len(blocked.result()) == 10
+
+    def test_mongo_to_dataframe_copy(self, collection, monkeypatch):
+        monkeypatch.setattr(get_dataset, 'dataset_cache', DatasetCache(marks=self.marks))
+        df = get_dataset.mongo_to_dataframe(0)
+        df.pop('ts')
+        df['temp_c'] = 0
+
+        assert list(get_dataset.mongo_to_dataframe(0)['temp_c']) == [float(i) for i in range(10)]
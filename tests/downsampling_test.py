@@ -0,0 +1,62 @@
+from web_service.classes.graphs.downsampling import lttb, min_max, downsample, figure_points, scatter_points
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+
+
+class TestDownsampling:
+    n = 10_000
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        self.x = np.arange(self.n)
+        self.y = np.sin(self.x / 500) + rng.normal(0, 0.01, self.n)
+        self.y[4321] = 5.0      # a spike
+        self.y[7654] = -5.0
+
+    def test_lttb(self):
+        kept = lttb(self.x, self.y, 500)
+
+        assert len(kept) == 500 and kept[0] == 0 and kept[-1] == self.n - 1
+        assert np.all(np.diff(kept) > 0) and {4321, 7654} <= set(kept)
+
+    def test_lttb_short(self):
+        assert list(lttb(self.x[:10], self.y[:10], 500)) == list(range(10))
+
+    def test_min_max(self):
+        kept = min_max(self.y, 300)
+
+        assert len(kept) <= 2 * 300 + 2 and kept[0] == 0 and kept[-1] == self.n - 1
+        assert np.all(np.diff(kept) > 0) and {4321, 7654} <= set(kept)
+
+    def test_min_max_buckets(self):
+        # every bucket of 4 keeps its lowest and highest point
+        y = np.array([3, 1, 4, 1.5, 9, 2, 6, 5, 3, 5, 8, 9.5])
+        assert list(min_max(y, 3)) == [0, 1, 2, 4, 5, 8, 11]
+
+    @pytest.mark.parametrize('method', ['lttb', 'minmax'])
+    def test_downsample_dates_nan(self, method):
+        dates = [datetime(2023, 1, 1) + timedelta(minutes=i) for i in range(self.n)]
+        y = self.y.copy()
+        y[::7] = np.nan
+        kept = downsample(dates, [y, -self.y], 400, method)
+
+        assert kept[0] == 0 and kept[-1] == self.n - 1 and len(kept) < 4 * 400 + 4
+        assert 4321 in kept and 7654 in kept
+
+    def test_downsample_unknown(self):
+        with pytest.raises(ValueError):
+            downsample(self.x, [self.y], 100, 'mean')
+
+    def test_figure_points(self):
+        assert figure_points((10, 10), dpi=100) == 1000
+
+    def test_figure_height(self):
+        assert figure_points((10, 4), dpi=100, axis=1) == 400
+
+    def test_scatter_points(self):
+        x = np.array([0, 0.001, 1, 1, np.nan, 0.5])
+        y = np.array([0, 0.001, 1, 0, 3, 0.5])
+
+        assert list(scatter_points(x, y, 10, 10)) == [0, 2, 3, 5]
+        assert len(scatter_points(self.y, self.y[::-1], 100, 100)) <= 100 * 100
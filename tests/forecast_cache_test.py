@@ -0,0 +1,42 @@
+from web_service.classes.time_series.forecast_cache import ForecastCache
+
+
+class TestForecastCache:
+    key = (0, 'model', True)
+    rows = [{'temp_c': 1.0}]
+
+    def test_hit(self):
+        cache = ForecastCache()
+        assert cache.get(self.key, (1, 5)) is None
+        cache.put(self.key, (1, 5), self.rows)
+
+        assert cache.get(self.key, (1, 5)) is self.rows
+        assert cache.metrics(0) == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5, 'entries': 1}
+
+    def test_new_tag(self):
+        # the model was saved again, then a sample was added
+        cache = ForecastCache()
+        cache.put(self.key, (1, 5), self.rows)
+
+        assert cache.get(self.key, (2, 5)) is None
+        cache.put(self.key, (2, 5), self.rows)
+        assert cache.get(self.key, (2, 6)) is None and cache.metrics(0)['misses'] == 2
+
+    def test_lru(self):
+        cache = ForecastCache(max_entries=2)
+        cache.put((0, 'a', True), 0, self.rows)
+        cache.put((0, 'b', True), 0, self.rows)
+        cache.get((0, 'a', True), 0)
+        cache.put((0, 'c', True), 0, self.rows)
+
+        assert cache.get((0, 'a', True), 0) is self.rows and cache.get((0, 'b', True), 0) is None
+
+    def test_invalidate(self):
+        cache = ForecastCache()
+        for key in [(0, 'a', True), (0, 'a', False), (0, 'b', True), (1, 'a', True)]:
+            cache.put(key, 0, self.rows)
+        cache.invalidate(0, 'a')
+
+        assert cache.metrics(0)['entries'] == 1 and cache.metrics(1)['entries'] == 1
+        cache.invalidate(0)
+        assert cache.metrics(0) == {'hits': 0, 'misses': 0, 'hit_ratio': None, 'entries': 0}
@@ -0,0 +1,134 @@
+from web_service.classes.graphs.graph_cache import GraphCache
+from flask import Flask
+from matplotlib.figure import Figure
+from datetime import datetime
+import hashlib
+import json
+import numpy as np
+import os
+import pytest
+
+KEY = (0, 'boxplot', ('temp_c',), (10, 10), None, None, 'lttb')
+PNG = b'\x89PNG one'
+
+
+class TestGraphCache:
+
+    def test_hit(self):
+        cache = GraphCache()
+        assert cache.get(KEY, 1) is None
+        etag, _ = cache.put(KEY, 1, PNG)
+
+        assert etag == hashlib.sha256(PNG).hexdigest() and cache.get(KEY, 1) == (etag, PNG)
+
+    def test_write_to_station(self):
+        cache = GraphCache()
+        cache.put(KEY, 1, PNG)
+
+        assert cache.get(KEY, 2) is None
+
+    def test_lru(self):
+        cache = GraphCache(max_entries=1)
+        cache.put(KEY, 1, PNG)
+        cache.put((1, 'histogram'), 1, PNG)
+
+        assert cache.get(KEY, 1) is None
+
+    def test_disk(self, tmp_path):
+        cache = GraphCache(path=str(tmp_path))
+        etag, _ = cache.put(KEY, 1, PNG)
+        cache.put((1, 'histogram'), 1, PNG)     # same bytes, same file
+
+        assert sorted(el for el in os.listdir(tmp_path) if el.endswith('.png')) == [etag + '.png']
+        restarted = GraphCache(path=str(tmp_path))
+        assert restarted.get(KEY, 1) == (etag, PNG) and restarted.get(KEY, 2) is None
+
+    def test_disk_bound(self, tmp_path):
+        cache = GraphCache(max_entries=1, path=str(tmp_path), max_files=2)
+        for i in range(4):
+            cache.put((i,), 1, bytes([i]))
+
+        assert len([el for el in os.listdir(tmp_path) if el.endswith('.png')]) == 2
+        assert cache.get((0,), 1) is None and cache.get((3,), 1) == (hashlib.sha256(bytes([3])).hexdigest(), bytes([3]))
+
+    def test_disk_json(self, tmp_path):
+        # the graph data is written as json and counts in the bound with the images
+        cache = GraphCache(max_entries=1, path=str(tmp_path), max_files=2)
+        data = json.dumps({'type': 'boxplot'}).encode()
+        etag, _ = cache.put(KEY + ('json',), 1, data, 'json')
+        cache.put((1,), 1, bytes([1]))
+
+        assert sorted(os.listdir(tmp_path)) == sorted([etag + '.json', hashlib.sha256(bytes([1])).hexdigest() + '.png',
+                                                        'keys'])
+        assert GraphCache(path=str(tmp_path)).get(KEY + ('json',), 1) == (etag, data)
+
+        cache.put((2,), 1, bytes([2]))
+        assert len([el for el in os.listdir(tmp_path) if el != 'keys']) == 2
+
+
+class FakeStation:
+    version = 1
+
+
+class Drawing:
+    # what the routes give to png_response
+    def __init__(self):
+        self.drawn = 0
+
+    def __call__(self):
+        self.drawn += 1
+        fig = Figure(figsize=(1, 1))
+        fig.subplots().plot([0, 1], [1, 0])
+        return fig
+
+
+@pytest.fixture
+def graphs_bp(monkeypatch):
+    # the blueprints load the stations from mongo when imported
+    from web_service.app.blueprints import graphs_bp
+    monkeypatch.setattr(graphs_bp, 'graph_cache', GraphCache())
+    return graphs_bp
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+class TestPngResponse:
+
+    def test_etag(self, app, graphs_bp):
+        draw = Drawing()
+        with app.test_request_context():
+            first = graphs_bp.png_response(FakeStation(), KEY, draw)
+            second = graphs_bp.png_response(FakeStation(), KEY, draw)
+
+        png = first.get_data()
+        assert first.status_code == 200 and png.startswith(b'\x89PNG') and draw.drawn == 1
+        assert first.headers['ETag'] == second.headers['ETag'] == f'"{hashlib.sha256(png).hexdigest()}"'
+
+    def test_not_modified(self, app, graphs_bp):
+        draw = Drawing()
+        with app.test_request_context():
+            etag = graphs_bp.png_response(FakeStation(), KEY, draw).headers['ETag']
+        with app.test_request_context(headers={'If-None-Match': etag}):
+            response = graphs_bp.png_response(FakeStation(), KEY, draw)
+
+        assert response.status_code == 304 and draw.drawn == 1
+
+
+class LineStation(FakeStation):
+    def line_data(self, pin1, pin3, figsize, start_date, end_date, downsampling):
+        return np.array([1.0, np.nan]), np.array([datetime(2023, 1, 1), datetime(2023, 1, 1, 0, 1)]), None
+
+
+class TestGraphData:
+
+    def test_lineplot(self, app, graphs_bp):
+        with app.test_request_context():
+            response = graphs_bp.json_response(LineStation(), KEY, 'lineplot', ('temp_c',), None, None, 'lttb')
+
+        assert response.mimetype == 'application/json' and 'ETag' in response.headers
+        assert json.loads(response.get_data()) == {'type': 'lineplot', 'pins': ['temp_c'],
+                                                   'ts': ['2023-01-01T00:00:00', '2023-01-01T00:01:00'],
+                                                   'series': {'temp_c': [1.0, None]}}
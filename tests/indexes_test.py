@@ -0,0 +1,66 @@
+from web_service.mongo.indexes import ensure_station_indexes, plan_stages
+from web_service.mongo.connect import db
+from datetime import datetime
+import pytest
+
+# NEEDS THE CONTAINER TO BE RUNNING (or another way to access mongo)
+
+# checks through explain() that the queries done by WeatherData use an index instead of scanning the collection
+
+
+class TestIndexes:
+    STATION_INDEX = 0
+    HOT_PIN = 'temp_c'
+
+    date1 = datetime(2023, 11, 13, 12, 30)
+    date2 = datetime(2023, 11, 13, 12, 55)
+
+    collection = db[f'station_{STATION_INDEX}']
+
+    @pytest.fixture(autouse=True, scope='class')
+    def hot_pin_index(self):
+        # the (pin, ts) index is dropped at the end, unless it was already there
+        existing = set(self.collection.index_information())
+        ensure_station_indexes(self.collection, [self.HOT_PIN])
+        added = set(self.collection.index_information()) - existing
+
+        yield
+
+        for name in added:
+            self.collection.drop_index(name)
+
+    def assert_index_scan(self, explain):
+        stages = plan_stages(explain)
+        assert 'IXSCAN' in stages and 'COLLSCAN' not in stages
+
+    def test_plan_stages(self):
+        explain = {'queryPlanner': {'winningPlan': {'stage': 'LIMIT', 'inputStage':
+                                                    {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}}}}
+
+        assert plan_stages(explain) == ['LIMIT', 'FETCH', 'IXSCAN']
+
+    def test_ts_index_unique(self):
+        unique = [el.get('unique', False) for el in self.collection.list_indexes() if list(el['key']) == ['ts']]
+
+        assert unique == [True]
+
+    def test_find_by_date(self):
+        self.assert_index_scan(self.collection.find({'ts': self.date1}).explain())
+
+    def test_find_by_date_range(self):
+        self.assert_index_scan(self.collection.find({'ts': {'$gte': self.date1, '$lte': self.date2}})
+                               .sort('ts').explain())
+
+    def test_oldest_date(self):
+        self.assert_index_scan(self.collection.find({}, {'ts': 1}).sort('ts').limit(1).explain())
+
+    def test_newest_date(self):
+        self.assert_index_scan(self.collection.find({}, {'ts': 1}).sort({'ts': -1}).limit(1).explain())
+
+    def test_page_after_date(self):
+        mongo_filter = {'$and': [{'ts': {'$gte': self.date1, '$lte': self.date2}}, {'ts': {'$gt': self.date1}}]}
+
+        self.assert_index_scan(self.collection.find(mongo_filter).sort('ts').limit(10).explain())
+
+    def test_filtered_hot_pin(self):
+        self.assert_index_scan(self.collection.find({self.HOT_PIN: {'$gte': 20, '$lte': 25}}).sort('ts').explain())
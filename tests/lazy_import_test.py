@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+PROBE = """
+import sys
+import web_service.classes.weather_station.weather_station
+print('tensorflow' in sys.modules, 'web_service.classes.time_series.forecaster' in sys.modules)
+"""
+
+
+def test_station_import_does_not_load_forecaster():
+    # a fresh interpreter, tensorflow may already be loaded in this one
+    probe = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True)
+
+    assert probe.returncode == 0, probe.stderr
+    assert probe.stdout.split() == ['False', 'False']
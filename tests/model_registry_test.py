@@ -0,0 +1,99 @@
+from web_service.classes.time_series.model_registry import ModelRegistry, StationModels
+from sklearn.preprocessing import MinMaxScaler
+import os
+import pickle
+
+
+class FakeModel:
+    def save_weights(self, path):
+        with open(path, 'wb') as f:
+            f.write(b'weights')
+
+
+class FakeForecaster:
+    def __init__(self, input_steps=300):
+        self.settings = {'station_id': 0, 'input_fields': None, 'output_fields': ['temp_c'],
+                         'input_steps': input_steps, 'horizon_steps': 250, 'optimizer': 'adam', 'loss_f': 'huber'}
+        self.scalers = (MinMaxScaler().fit([[0], [10]]), MinMaxScaler().fit([[5], [6]]))
+        self.model = FakeModel()
+
+
+class TestModelRegistry:
+
+    def test_save(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path))
+        model_id = registry.save(0, FakeForecaster())
+        model_dir = tmp_path / 'station_0' / model_id
+
+        assert registry.ids(0) == [model_id]
+        assert sorted(os.listdir(model_dir)) == ['config.json', 'model.weights.h5', 'scalers.pkl']
+        assert registry.config(0, model_id)['settings']['output_fields'] == ['temp_c']
+
+        with open(model_dir / 'scalers.pkl', 'rb') as f:
+            input_scaler, output_scaler = pickle.load(f)
+        assert input_scaler.data_max_[0] == 10 and output_scaler.data_min_[0] == 5
+
+    def test_save_existing(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path))
+        model_id = registry.save(0, FakeForecaster())
+        created = registry.config(0, model_id)['created']
+        registry.save(0, FakeForecaster(input_steps=10), model_id)
+
+        assert registry.ids(0) == [model_id]
+        assert registry.config(0, model_id) == {'created': created, 'version': 2, 'settings': FakeForecaster(10).settings}
+
+    def test_ids_after_restart(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path))
+        ids = [registry.save(0, FakeForecaster()) for _ in range(3)]
+        registry.save(1, FakeForecaster())
+        os.makedirs(tmp_path / 'station_0' / 'interrupted')
+
+        restarted = ModelRegistry(str(tmp_path))
+        assert restarted.ids(0) == ids and len(restarted.ids(1)) == 1 and restarted.ids(2) == []
+
+    def test_resident_lru(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path), max_resident=2)
+        forecasters = [FakeForecaster() for _ in range(3)]
+        ids = [registry.save(0, el) for el in forecasters]
+
+        assert not registry.is_resident(0, ids[0]) and registry.is_resident(0, ids[2])
+        assert registry.load(0, ids[1]) is forecasters[1]
+
+        registry.save(1, FakeForecaster())   # ids[1] was used more recently than ids[2]
+        assert registry.is_resident(0, ids[1]) and not registry.is_resident(0, ids[2])
+
+    def test_delete(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path))
+        ids = [registry.save(0, FakeForecaster()) for _ in range(2)]
+        registry.delete(0, ids[0])
+
+        assert registry.ids(0) == [ids[1]] and not registry.is_resident(0, ids[0])
+        assert os.listdir(tmp_path / 'station_0') == [ids[1]]
+        assert ModelRegistry(str(tmp_path)).ids(0) == [ids[1]]
+
+    def test_station_models(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path))
+        forecasters = [FakeForecaster() for _ in range(2)]
+        for el in forecasters:
+            registry.save(0, el)
+        models = StationModels(registry, 0)
+
+        assert len(models) == 2 and models[0] is forecasters[0] and models[-1] is forecasters[1]
+        assert len(StationModels(registry, 1)) == 0
+
+    def test_version(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path))
+        model_id = registry.save(0, FakeForecaster())
+        first = registry.version(0, model_id)
+        registry.save(0, FakeForecaster(), model_id)
+
+        assert first == 1 and registry.version(0, model_id) == 2
+        assert ModelRegistry(str(tmp_path)).version(0, model_id) == 2
+
+    def test_version_in_memory(self, tmp_path, monkeypatch):
+        # the config file is not read again for every version
+        registry = ModelRegistry(str(tmp_path))
+        model_id = registry.save(0, FakeForecaster())
+        monkeypatch.setattr(registry, 'config', None)
+
+        assert registry.version(0, model_id) == 1
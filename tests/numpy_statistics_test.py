@@ -0,0 +1,92 @@
+from web_service.classes.statistics.numpy_statistics import NumpyStatistics
+from web_service.classes.statistics.statistics import Statistics
+import numpy as np
+from math import sqrt, nan
+
+
+class TestNumpyStatistics:
+    empty = []
+
+    one_value = [704]
+
+    dicrete = [1,2,3,4,5]
+
+    floats = [-3.4,1.222, 5.77, 2.3001]
+
+    missing = [1, nan, 2, 3, nan, 4, 5]
+
+    all_missing = [nan, nan]
+
+    both_inf = [float('inf'), float('-inf')]
+
+    def test_get_mean_0(self):
+        assert NumpyStatistics.get_mean(self.empty) is None
+
+    def test_get_mean_1(self):
+        res = NumpyStatistics.get_mean(self.one_value)
+
+        assert res == self.one_value[0]
+
+    def test_get_mean_2(self):
+        res = NumpyStatistics.get_mean(self.floats)
+
+        assert round(res,6) == round(Statistics.get_mean(self.floats),6)
+
+    def test_get_mean_3(self):
+        res = NumpyStatistics.get_mean(self.missing)
+
+        assert res == 3
+
+    def test_get_mean_4(self):
+        res = NumpyStatistics.get_mean(self.both_inf)
+
+        assert str(res) == 'nan'
+
+    def test_get_max_0(self):
+        assert NumpyStatistics.get_max(self.empty) is None
+
+    def test_get_max_1(self):
+        res = NumpyStatistics.get_max(self.floats)
+
+        assert res == 5.77
+
+    def test_get_max_2(self):
+        res = NumpyStatistics.get_max(self.missing)
+
+        assert res == 5
+
+    def test_get_min_0(self):
+        assert NumpyStatistics.get_min(self.all_missing) is None
+
+    def test_get_min_1(self):
+        res = NumpyStatistics.get_min(self.floats)
+
+        assert res == -3.4
+
+    def test_get_min_2(self):
+        res = NumpyStatistics.get_min(self.missing)
+
+        assert res == 1
+
+    def test_get_std_0(self):
+        assert NumpyStatistics.get_std(self.empty) is None
+
+    def test_get_std_1(self):
+        res = NumpyStatistics.get_std(self.dicrete)
+
+        assert round(res, 12) == round(sqrt(2), 12)
+
+    def test_get_std_2(self):
+        res = NumpyStatistics.get_std(self.floats)
+
+        assert round(res,6) == round(3.2770960242073,6)
+
+    def test_get_std_3(self):
+        res = NumpyStatistics.get_std(np.array(self.missing))
+
+        assert round(res, 12) == round(sqrt(2), 12)
+
+    def test_results_are_floats(self):
+        res = NumpyStatistics.get_max(np.array(self.dicrete, dtype=np.int64))
+
+        assert type(res) == float
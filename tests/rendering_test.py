@@ -0,0 +1,80 @@
+from web_service.classes.graphs.boxplot import Boxplot
+from web_service.classes.graphs.histogram import Histogram
+from web_service.classes.graphs.scatterplot import ScatterPlot
+from web_service.classes.graphs.summaries import histogram_summary, box_summary
+from web_service.classes.graphs.lineplot import LinePlot
+from web_service.classes.graphs.rendering import RenderPool, render_png
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+import matplotlib.pyplot as plt
+import numpy as np
+import os
+import pytest
+import time
+
+VALUES = list(np.random.default_rng(0).normal(15, 5, 200))
+DATES = [datetime(2023, 1, 1) + timedelta(minutes=i) for i in range(200)]
+
+GRAPHS = [lambda: Boxplot(box_summary(VALUES), 'temp_c', (4, 4)),
+          lambda: Histogram(histogram_summary(VALUES), 'temp_c', (4, 4)),
+          lambda: ScatterPlot(VALUES, VALUES[::-1], 'temp_c', 'humidity', (4, 4)),
+          lambda: LinePlot(VALUES, DATES, 'temp_c', 'ts', figsize=(4, 4)),
+          lambda: LinePlot(VALUES, DATES, 'temp_c', 'ts', 'humidity', VALUES[::-1], (4, 4))]
+
+
+class TestRendering:
+
+    @pytest.mark.parametrize('graph', GRAPHS)
+    def test_no_pyplot(self, graph):
+        fig = graph().plot_graph()
+        png = render_png(fig)
+
+        assert png.startswith(b'\x89PNG') and plt.get_fignums() == [] and fig.axes == []
+
+    def test_figsize(self):
+        assert tuple(LinePlot(VALUES, DATES, 'temp_c', 'ts', figsize=(4, 3)).fig.get_size_inches()) == (4, 3)
+
+    def test_pool(self):
+        pool = RenderPool(max_workers=2, max_pending=0)
+        running, most = [0], [0]
+        lock = Lock()
+
+        def draw():
+            with lock:
+                running[0] += 1
+                most[0] = max(most[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return GRAPHS[0]().plot_graph()
+
+        with ThreadPoolExecutor(6) as requests:
+            pngs = list(requests.map(lambda _: pool.render(draw), range(6)))
+
+        assert all(el.startswith(b'\x89PNG') for el in pngs) and most[0] == 2
+
+    def test_pool_error(self):
+        def draw():
+            raise ValueError('no data')
+
+        with pytest.raises(ValueError):
+            RenderPool(1, 1).render(draw)
+
+    @pytest.mark.slow
+    def test_bounded_memory(self):
+        # once the first renders warmed up the caches of matplotlib, rendering does not take more memory
+        # (benchmarks/render_soak_benchmark.py runs the same for longer)
+        def rss_mb():
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+        pool = RenderPool()
+        warm = None
+        with ThreadPoolExecutor(4) as requests:
+            for batch in range(12):     # by 100, the pngs of a batch are kept until it ends
+                list(requests.map(lambda i: pool.render(lambda: GRAPHS[i % len(GRAPHS)]().plot_graph()), range(100)))
+                if batch == 1:
+                    warm = rss_mb()
+
+        assert rss_mb() - warm < 20
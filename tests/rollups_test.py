@@ -0,0 +1,82 @@
+from web_service.classes.statistics.rollups import Rollups
+from web_service.classes.statistics.running_statistics import RunningStatistics
+from web_service.classes.statistics.statistics_type import StatType
+from datetime import datetime
+from math import sqrt
+
+
+class TestRollups:
+
+    def test_plan_0(self):
+        start = datetime(2023, 11, 13, 12, 30)
+        end = datetime(2023, 11, 13, 12, 55)
+
+        buckets, raw = Rollups._plan(start, end)
+
+        assert buckets == {'1h': [], '1d': []} and raw == [{'$gte': start, '$lte': end}]
+
+    def test_plan_1(self):
+        start = datetime(2023, 11, 13, 10, 30)
+        end = datetime(2023, 11, 13, 13, 15)
+
+        buckets, raw = Rollups._plan(start, end)
+
+        assert buckets == {'1h': [(datetime(2023, 11, 13, 11), datetime(2023, 11, 13, 13))], '1d': []} \
+               and raw == [{'$gte': start, '$lt': datetime(2023, 11, 13, 11)},
+                           {'$gte': datetime(2023, 11, 13, 13), '$lte': end}]
+
+    def test_plan_2(self):
+        start = datetime(2023, 11, 12, 18, 2)
+        end = datetime(2023, 11, 25, 11, 39)
+
+        buckets, raw = Rollups._plan(start, end)
+
+        assert buckets['1d'] == [(datetime(2023, 11, 13), datetime(2023, 11, 25))] \
+               and buckets['1h'] == [(datetime(2023, 11, 12, 19), datetime(2023, 11, 13)),
+                                     (datetime(2023, 11, 25), datetime(2023, 11, 25, 11))] \
+               and raw == [{'$gte': start, '$lt': datetime(2023, 11, 12, 19)},
+                           {'$gte': datetime(2023, 11, 25, 11), '$lte': end}]
+
+    def test_plan_3(self):
+        # aligned boundaries: no raw samples on the left, only the last instant on the right
+        start = datetime(2023, 11, 13)
+        end = datetime(2023, 11, 15)
+
+        buckets, raw = Rollups._plan(start, end)
+
+        assert buckets == {'1h': [], '1d': [(start, end)]} and raw == [{'$gte': end, '$lte': end}]
+
+    def test_to_statistics_0(self):
+        values = [1, 2, 3, 4, 5]
+        moments = {'count': len(values), 'mean': 3, 'm2': sum((el - 3) ** 2 for el in values),
+                   'min': min(values), 'max': max(values)}
+
+        stats = Rollups.to_statistics(moments)
+
+        assert stats == {StatType.MEAN: 3, StatType.MAX: 5, StatType.MIN: 1, StatType.STD: sqrt(2)}
+
+    def test_to_statistics_1(self):
+        moments = {'count': 0, 'mean': 0, 'm2': 0, 'min': None, 'max': None}
+
+        stats = Rollups.to_statistics(moments, [StatType.MEAN])
+
+        assert stats == {StatType.MEAN: None}
+
+    def test_to_statistics_2(self):
+        # large values with a small spread, in two buckets: sumsq / count - mean ** 2 gives 0 or noise here
+        buckets = [[1e9 + 0.1, 1e9 + 0.2], [1e9 + 0.3, 1e9 + 0.4, 1e9 + 0.5]]
+        acc = RunningStatistics()
+        for values in buckets:
+            bucket = RunningStatistics()
+            for el in values:
+                bucket.push(el)
+            acc.merge(RunningStatistics.from_moments(bucket.moments()))
+
+        stats = Rollups.to_statistics(acc.moments(), [StatType.STD])
+
+        assert round(stats[StatType.STD], 6) == round(sqrt(0.02), 6)
+
+    def test_numeric_fields(self):
+        sample = {'_id': 1, 'ts': datetime(2023, 11, 13), 'temp': 21.5, 'hum': 40, 'rain': True, 'name': 'x'}
+
+        assert Rollups._numeric_fields(sample) == {'temp': 21.5, 'hum': 40}
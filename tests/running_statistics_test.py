@@ -0,0 +1,67 @@
+from web_service.classes.statistics.running_statistics import RunningStatistics
+from web_service.classes.statistics.statistics import Statistics
+from web_service.classes.statistics.statistics_type import StatType
+
+
+class TestRunningStatistics:
+
+    floats = [-3.4,1.222, 5.77, 2.3001]
+
+    def test_empty(self):
+        acc = RunningStatistics()
+
+        assert [acc.get(el) for el in StatType] == [None] * 4
+
+    def test_push_0(self):
+        acc = RunningStatistics()
+        for el in self.floats:
+            acc.push(el)
+
+        assert round(acc.mean, 9) == round(Statistics.get_mean(self.floats), 9) \
+               and round(acc.std, 9) == round(Statistics.get_std(self.floats), 9) \
+               and acc.min == -3.4 and acc.max == 5.77 and acc.count == 4
+
+    def test_push_1(self):
+        acc = RunningStatistics()
+        acc.push(704)
+
+        assert acc.mean == 704 and acc.std == 0 and acc.min == acc.max == 704
+
+    def test_from_moments_0(self):
+        first = RunningStatistics()
+        for el in self.floats[:2]:
+            first.push(el)
+
+        acc = RunningStatistics.from_moments(first.moments())
+        for el in self.floats[2:]:
+            acc.push(el)
+
+        assert round(acc.mean, 9) == round(Statistics.get_mean(self.floats), 9) \
+               and round(acc.std, 9) == round(Statistics.get_std(self.floats), 9) \
+               and acc.min == -3.4 and acc.max == 5.77
+
+    def test_from_moments_1(self):
+        acc = RunningStatistics.from_moments({'count': 0, 'mean': 0, 'm2': 0, 'min': None, 'max': None})
+
+        assert acc.count == 0 and acc.mean is None
+
+    def test_merge_0(self):
+        acc, other = RunningStatistics(), RunningStatistics()
+        for el in self.floats[:1]:
+            acc.push(el)
+        for el in self.floats[1:]:
+            other.push(el)
+        acc.merge(other)
+
+        assert round(acc.mean, 9) == round(Statistics.get_mean(self.floats), 9) \
+               and round(acc.std, 9) == round(Statistics.get_std(self.floats), 9) \
+               and acc.min == -3.4 and acc.max == 5.77 and acc.count == 4
+
+    def test_merge_1(self):
+        # merging into or from an empty accumulator
+        acc, other = RunningStatistics(), RunningStatistics()
+        other.push(704)
+        acc.merge(other)
+        acc.merge(RunningStatistics())
+
+        assert acc.mean == 704 and acc.std == 0 and acc.min == acc.max == 704 and acc.count == 1
@@ -0,0 +1,42 @@
+from web_service.classes.graphs.summaries import histogram_summary, box_summary, binned_kde, MAX_BINS
+from matplotlib.cbook import boxplot_stats
+import numpy as np
+import pytest
+
+
+class TestSummaries:
+
+    def setup_method(self):
+        self.values = np.random.default_rng(0).normal(15, 5, 20_000).round(1)
+
+    def test_box(self):
+        expected = boxplot_stats(self.values)[0]
+        summary = box_summary(np.append(self.values, np.nan))
+
+        for key in ['q1', 'med', 'q3', 'whislo', 'whishi']:
+            assert summary[key] == pytest.approx(expected[key])
+        assert summary['fliers'] == sorted(set(expected['fliers'])) and summary['n'] == 20_000
+
+    def test_histogram(self):
+        summary = histogram_summary(self.values)
+        counts, edges = np.histogram(self.values, 'auto')
+
+        assert summary['counts'] == counts.tolist() and summary['edges'] == edges.tolist()
+        assert sum(summary['counts']) == 20_000
+
+    def test_max_bins(self):
+        values = np.random.default_rng(0).normal(0, 1, 2_000_000)
+        assert len(histogram_summary(values)['counts']) == MAX_BINS
+
+    def test_kde(self):
+        values = self.values[:2000]
+        x, y = binned_kde(values)
+        bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+        exact = np.exp(-0.5 * ((x[:, None] - values[None]) / bandwidth) ** 2).sum(axis=1) \
+                / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+
+        assert np.abs(y - exact).max() < 0.01 * exact.max()
+
+    def test_empty(self):
+        assert histogram_summary([np.nan])['counts'] == [] and box_summary([])['med'] is None
+        assert histogram_summary([3.0, 3.0])['kde_x'] == []
@@ -0,0 +1,48 @@
+from web_service.classes.time_series.training_jobs import TrainingJobs
+from datetime import datetime
+import numpy as np
+import os
+import time
+
+
+class Crash:
+    # kills the worker process that unpickles it
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+class FakeModel:
+    def get_weights(self):
+        return [np.zeros(2)]
+
+
+class FakeForecaster:
+    model_config = {'input_steps': 2, 'horizon_steps': 1}
+    model = FakeModel()
+
+    def set_weights(self, weights, trained_until):
+        self.weights = weights
+
+
+def wait(jobs, job_id, timeout=120):
+    status = jobs.status(job_id)
+    end = time.monotonic() + timeout
+    while status['status'] in ('queued', 'running') and time.monotonic() < end:
+        time.sleep(0.2)
+        status = jobs.status(job_id)
+    return status
+
+
+class TestTrainingJobs:
+
+    def test_dead_worker(self):
+        jobs = TrainingJobs(max_jobs=1)
+        crashed = jobs.submit(0, 'model', FakeForecaster(), series=(Crash(), np.zeros((4, 1)), datetime(2023, 1, 1)))
+        status = wait(jobs, crashed)
+
+        assert status['status'] == 'failed' and 'died' in status['error']
+        assert jobs.running_job(0, 'model') is None
+
+        # a new pool takes the next job, which gets to the worker (and fails there without tensorflow or keeps on)
+        second = jobs.submit(0, 'model', FakeForecaster(), series=(np.zeros((4, 1)), np.zeros((4, 1)), None))
+        assert second is not None and 'died' not in wait(jobs, second).get('error', '')
@@ -1,5 +1,9 @@
+from web_service.classes.weather_station import weather_station
 from web_service.classes.weather_station.weather_station import WeatherStation
-from datetime import datetime
+from web_service.classes.time_series.model_registry import ModelRegistry
+from web_service.classes.statistics.statistics_backend import StatBackend
+from datetime import datetime, timedelta
+import pytest
 
 # NEEDS THE CONTAINER TO BE RUNNING (or another way to access mongo)
 
@@ -11,6 +15,11 @@ from datetime import datetime
 class TestWeatherStation:
     STATION_INDEX = 0
 
+    @pytest.fixture(autouse=True)
+    def empty_registry(self, tmp_path, monkeypatch):
+        # models are saved on disk, each test starts without the ones of the others
+        monkeypatch.setattr(weather_station, 'model_registry', ModelRegistry(str(tmp_path)))
+
     wrong_date = datetime(2023, 12, 30, 12, 4)
     existing_inner_date = datetime(2023,11,13,12,30)
 
@@ -149,6 +158,36 @@ class TestWeatherStation:
 
         assert history == [target]
 
+    def test_get_measurements_by_date_range_5(self):
+        st = WeatherStation(self.STATION_INDEX)
+        date1 = datetime(2023, 11, 13, 12, 30)
+        date2 = datetime(2023, 11, 13, 12, 55)
+
+        history = st.get_measurements_by_date_range(date1, date2)
+
+        first_page = st.get_measurements_by_date_range(date1, date2, limit=10)
+        second_page = st.get_measurements_by_date_range(date1, date2, limit=10, after=first_page[-1]['ts'])
+
+        assert first_page + second_page == history[:20]
+
+    def test_get_measurements_by_date_range_6(self):
+        st = WeatherStation(self.STATION_INDEX)
+
+        history = st.get_measurements_by_date_range(limit=10, after=st.end)
+
+        assert history is None
+
+    def test_get_measurement_mongo_filtered_4(self):
+        st = WeatherStation(self.STATION_INDEX)
+        filter = {'temp_c': {'$gte': 0}}
+
+        filtered_samples = st.get_measurement_mongo_filtered(filter)
+
+        first_page = st.get_measurement_mongo_filtered(filter, limit=5)
+        second_page = st.get_measurement_mongo_filtered(filter, limit=5, after=first_page[-1]['ts'])
+
+        assert first_page + second_page == filtered_samples[:10]
+
     def test_get_measurement_mongo_filtered_0(self):
         st = WeatherStation(self.STATION_INDEX)
 
@@ -336,6 +375,17 @@ class TestWeatherStation:
 
         assert pre_length == post_length - 1
 
+    def test_add_measurement_6(self):
+        st = WeatherStation(self.STATION_INDEX)
+        new_date = datetime(2023, 11, 14, 17, 1, 30)
+
+        st.add_measurement(new_date, temp_c=1)
+        st.data.delete_one({'ts': new_date})   # deleted by another process
+        try:
+            assert st.add_measurement(new_date, temp_c=2) != 400
+        finally:
+            st.delete_sample_by_date(new_date)
+
     def test_delete_sample_by_date_0(self):
         st = WeatherStation(self.STATION_INDEX)
 
@@ -533,6 +583,149 @@ class TestWeatherStation:
         assert round(mean, 6) == round(st.mean(FIELD,date1,date2), 6) and max(my_array) == st.max(FIELD,date1,date2) \
                and min(my_array) == st.min(FIELD,date1,date2)
 
+    def test_all_statistics_0(self):
+        st = WeatherStation(self.STATION_INDEX)
+        FIELDS = ['temp_c', 'humidity']
+
+        stats = st.all_statistics(FIELDS)
+
+        check = True
+        for field in FIELDS:
+            my_array = st._get_feature_array(field)
+            if round(stats[field]['mean'], 6) != round(sum(my_array) / len(my_array), 6) \
+                    or stats[field]['max'] != max(my_array) or stats[field]['min'] != min(my_array) \
+                    or round(stats[field]['stdev'], 6) != round(st.std(field), 6):
+                check = False
+
+        assert check
+
+    def test_all_statistics_1(self):
+        st = WeatherStation(self.STATION_INDEX)
+        FIELD = 'temp_c'
+
+        date1 = datetime(2023, 11, 13, 12, 30)
+        date2 = datetime(2023, 11, 13, 12, 55)
+
+        stats = st.all_statistics([FIELD], date1, date2)[FIELD]
+
+        assert round(stats['mean'], 6) == round(st.mean(FIELD, date1, date2), 6) \
+               and stats['max'] == st.max(FIELD, date1, date2) and stats['min'] == st.min(FIELD, date1, date2)
+
+    def test_all_statistics_2(self):
+        st = WeatherStation(self.STATION_INDEX)
+
+        stats = st.all_statistics(['temp_c'], self.wrong_date, self.wrong_date)
+
+        assert stats == {'temp_c': {'mean': None, 'max': None, 'min': None, 'stdev': None}}
+
+    def test_stat_backend_0(self):
+        st = WeatherStation(self.STATION_INDEX)
+        FIELD = 'temp_c'
+
+        date1 = datetime(2023, 11, 13, 12, 30)
+        date2 = datetime(2023, 11, 13, 12, 55)
+
+        mongo_stats = [st.mean(FIELD, date1, date2), st.max(FIELD, date1, date2),
+                       st.min(FIELD, date1, date2), st.std(FIELD, date1, date2)]
+
+        st.stat_backend = StatBackend.PYTHON
+        python_stats = [st.mean(FIELD, date1, date2), st.max(FIELD, date1, date2),
+                        st.min(FIELD, date1, date2), st.std(FIELD, date1, date2)]
+
+        assert [round(el, 6) for el in mongo_stats] == [round(el, 6) for el in python_stats]
+
+    def test_stat_backend_1(self):
+        st = WeatherStation(self.STATION_INDEX)
+
+        assert st.mean('name') is None and st.mean('temp_c', self.wrong_date, self.wrong_date) is None
+
+    def test_stat_backend_2(self):
+        # the in-memory accumulators of the rollup backend see the writes of another worker, here another station
+        st = WeatherStation(self.STATION_INDEX)
+        other = WeatherStation(self.STATION_INDEX)
+        new_date = datetime(2023, 11, 14, 17, 1, 30)   # between two existing samples, a new generation
+        pre_max = st.max('temp_c')   # fills the accumulator
+
+        other.add_measurement(new_date, temp_c=1000)
+        try:
+            added_max = st.max('temp_c')
+        finally:
+            other.delete_sample_by_date(new_date)
+
+        assert added_max == 1000 and st.max('temp_c') == pre_max
+
+    def test_stat_backend_3(self):
+        # an append of another worker only adds the new samples to the accumulators
+        st = WeatherStation(self.STATION_INDEX)
+        other = WeatherStation(self.STATION_INDEX)
+        FIELD = 'temp_c'
+        stats = [st.mean(FIELD), st.std(FIELD)]
+        new_date = st.end + timedelta(minutes=1)
+
+        other.add_measurement(new_date, temp_c=stats[0] + 10)
+        try:
+            appended = [st.mean(FIELD), st.std(FIELD), st.max(FIELD)]
+            st.stat_backend = StatBackend.MONGO
+            expected = [st.mean(FIELD), st.std(FIELD), st.max(FIELD)]
+        finally:
+            other.delete_sample_by_date(new_date)
+
+        assert [round(el, 6) for el in appended] == [round(el, 6) for el in expected] and appended[0] > stats[0]
+
+    def test_rollups_0(self):
+        st = WeatherStation(self.STATION_INDEX)
+        FIELD = 'temp_c'
+
+        date1 = datetime(2023, 11, 12, 20, 17)
+        date2 = datetime(2023, 11, 16, 9, 41)  # whole days, whole hours and raw samples
+
+        rollup_stats = [st.mean(FIELD, date1, date2), st.max(FIELD, date1, date2),
+                        st.min(FIELD, date1, date2), st.std(FIELD, date1, date2)]
+
+        st.stat_backend = StatBackend.MONGO
+        mongo_stats = [st.mean(FIELD, date1, date2), st.max(FIELD, date1, date2),
+                       st.min(FIELD, date1, date2), st.std(FIELD, date1, date2)]
+
+        assert [round(el, 6) for el in rollup_stats] == [round(el, 6) for el in mongo_stats]
+
+    def test_rollups_1(self):
+        st = WeatherStation(self.STATION_INDEX)
+        FIELD = 'temp_c'
+        new_date = datetime(2023, 11, 14, 17, 1, 30)  # between two existing samples
+
+        pre_max = st.max(FIELD)
+
+        st.add_measurement(new_date, temp_c=pre_max + 100)
+        added_max = st.max(FIELD)
+
+        st.delete_sample_by_date(new_date)
+        post_max = st.max(FIELD)
+
+        assert added_max == pre_max + 100 and post_max == pre_max
+
+    def test_watermarks_0(self):
+        st = WeatherStation(self.STATION_INDEX)
+        new_date = st.end + timedelta(minutes=1)
+        generation, version = st.generation, st.version
+
+        st.add_measurement(new_date, temp_c=1)
+        appended = (st.generation, st.version)
+
+        st.delete_sample_by_date(new_date)
+
+        assert appended == (generation, version + 1) and (st.generation, st.version) == (generation + 1, version + 2)
+
+    def test_watermarks_1(self):
+        st = WeatherStation(self.STATION_INDEX)
+        new_date = datetime(2023, 11, 14, 17, 1, 30)  # between two existing samples
+        generation = st.generation
+
+        st.add_measurement(new_date, temp_c=1)
+        inserted = st.generation
+        st.delete_sample_by_date(new_date)
+
+        assert inserted == generation + 1
+
     def test_create_model_0(self):
         st = WeatherStation(self.STATION_INDEX)
 
@@ -0,0 +1,75 @@
+from web_service.classes.time_series.windowing import n_windows, window_views, WindowBatches
+import numpy as np
+import pandas as pd
+
+
+def loop_windows(X, y, input_steps, horizon_steps):
+    # the windowing Forecaster.make_window used before the strided views
+    X_res, y_res = [], []
+
+    for i in range(len(X) - input_steps - horizon_steps + 1):
+        X_res.append(X.iloc[i : i+input_steps].to_numpy())
+        y_res.append(y.iloc[i+input_steps : i+input_steps+horizon_steps])
+
+    return np.array(X_res), np.array(y_res)
+
+
+class TestWindowing:
+    df = pd.DataFrame({'a': np.arange(40, dtype=float), 'b': np.arange(40, dtype=float) ** 2,
+                       'c': -np.arange(40, dtype=float)})
+
+    def test_n_windows(self):
+        assert n_windows(40, 5, 3) == 33 and n_windows(7, 5, 3) == 0 and n_windows(8, 5, 3) == 1
+
+    def test_window_views_0(self):
+        X_win, y_win = window_views(self.df.to_numpy(), self.df[['b']].to_numpy(), 5, 3)
+        X_ref, y_ref = loop_windows(self.df, self.df[['b']], 5, 3)
+
+        assert X_win.shape == X_ref.shape == (33, 5, 3) and y_win.shape == y_ref.shape == (33, 3, 1)
+        assert np.array_equal(X_win, X_ref) and np.array_equal(y_win, y_ref)
+
+    def test_window_views_1(self):
+        X_win, y_win = window_views(self.df[['a', 'c']].to_numpy(), self.df.to_numpy(), 1, 1)
+        X_ref, y_ref = loop_windows(self.df[['a', 'c']], self.df, 1, 1)
+
+        assert np.array_equal(X_win, X_ref) and np.array_equal(y_win, y_ref)
+
+    def test_window_views_empty(self):
+        X_win, y_win = window_views(self.df.to_numpy()[:7], self.df.to_numpy()[:7], 5, 3)
+
+        assert X_win.shape == (0, 5, 3) and y_win.shape == (0, 3, 3)
+
+    def test_window_views_no_copy(self):
+        X = self.df.to_numpy()
+        X_win, y_win = window_views(X, X, 5, 3)
+
+        assert np.shares_memory(X_win, X) and np.shares_memory(y_win, X) and not X_win.flags.writeable
+
+    def test_batches_0(self):
+        X_win, y_win = window_views(self.df.to_numpy(), self.df.to_numpy(), 5, 3)
+        batches = WindowBatches(X_win, y_win, batch_size=10)
+        X_parts, y_parts = zip(*batches)
+
+        assert len(batches) == 4 and [len(el) for el in X_parts] == [10, 10, 10, 3]
+        assert np.array_equal(np.concatenate(X_parts), X_win) and np.array_equal(np.concatenate(y_parts), y_win)
+
+    def test_batches_shuffle(self):
+        X_win, y_win = window_views(self.df.to_numpy(), self.df.to_numpy(), 5, 3)
+        batches = WindowBatches(X_win, y_win, batch_size=8, shuffle=True, seed=0)
+        X_parts, y_parts = zip(*batches)
+        X_all, y_all = np.concatenate(X_parts), np.concatenate(y_parts)
+
+        # every window once, still paired with its own target
+        order = np.argsort(X_all[:, 0, 0])
+        assert np.array_equal(X_all[order], X_win) and np.array_equal(y_all[order], y_win)
+
+    def test_batches_index_error(self):
+        X_win, y_win = window_views(self.df.to_numpy(), self.df.to_numpy(), 5, 3)
+        batches = WindowBatches(X_win, y_win, batch_size=10)
+
+        assert np.array_equal(batches[-1][0], X_win[30:])
+        try:
+            batches[4]
+            assert False
+        except IndexError:
+            pass
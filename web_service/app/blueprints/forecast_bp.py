@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 from web_service.utils.ws_helper_functions import find_station
 from typing import Union
 
@@ -74,7 +74,79 @@ def train_model(station: Union[int,str], idx : int):
     if not params:
         params = {}
 
-    return s.train_model(idx = idx, **params)
+    # {"wait": true} trains inside the request, otherwise the training is queued and followed through /jobs/<id>
+    if params.pop('wait', False):
+        return jsonify({'result' : s.train_model(idx = idx, **params)}), 200
+
+    job_id = s.submit_training(idx, **params)
+    if job_id is None:
+        return jsonify({'error' : f'model {idx} is already being trained'}), 409
+
+    response = jsonify({'job' : job_id})
+    response.headers['Location'] = url_for('forecast.training_job', station=station, job_id=job_id)
+    return response, 202
+
+
+@forecast_bp.route('/models/<idx>/fine-tune', methods = ['POST'])
+def fine_tune_model(station: Union[int,str], idx : int):
+    idx = int(idx)
+    s = find_station(station)
+    if not s:
+        return jsonify({'error' : f'Station not found'}), 404
+
+    if idx < 0 or idx >= len(s.models):
+        return jsonify({'error' : 'model not found'}), 404
+
+    params = request.get_json(silent=True)
+    if not params:
+        params = {}
+
+    # a few epochs on the samples added since the last training, queued like a training unless {"wait": true}
+    try:
+        if params.pop('wait', False):
+            return jsonify({'result' : s.fine_tune_model(idx = idx, **params)}), 200
+
+        job_id = s.submit_fine_tuning(idx, **params)
+    except ValueError as e:
+        return jsonify({'error' : str(e)}), 400
+
+    if job_id is None:
+        return jsonify({'error' : f'model {idx} is already being trained'}), 409
+
+    response = jsonify({'job' : job_id})
+    response.headers['Location'] = url_for('forecast.training_job', station=station, job_id=job_id)
+    return response, 202
+
+
+@forecast_bp.route('/jobs/<job_id>')
+def training_job(station: Union[int,str], job_id : str):
+    s = find_station(station)
+    if not s:
+        return jsonify({'error' : f'Station not found'}), 404
+
+    result = s.training_status(job_id)
+    if result is None:
+        return jsonify({'error' : 'job not found'}), 404
+
+    return jsonify(result), 200
+
+
+@forecast_bp.route('/models/<idx>/export', methods = ['POST'])
+def export_model(station: Union[int,str], idx : int):
+    idx = int(idx)
+    s = find_station(station)
+    if not s:
+        return jsonify({'error' : f'Station not found'}), 404
+
+    if idx < 0 or idx >= len(s.models):
+        return jsonify({'error' : 'model not found'}), 404
+
+    # {"quantize": bool, "num_threads": int}, what predictions run on from now on
+    params = request.get_json(silent=True)
+    if not params:
+        params = {}
+
+    return jsonify(s.export_model(idx, **params)), 200
 
 
 @forecast_bp.route('/models/<idx>/predict')
@@ -87,6 +159,19 @@ def forecast(station: Union[int,str], idx :  int):
     if idx < 0 or idx >= len(s.models):
         return jsonify({'error' : 'model not found'}), 404
 
-    result = s.predict(idx)
+    # ?single_shot=false builds the horizon one step at a time as the first version did
+    single_shot = request.args.get('single_shot', 'true').lower() != 'false'
+    result, hit = s.cached_predict(idx, single_shot)
 
-    return jsonify(result), 200
+    response = jsonify(result)
+    response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response, 200
+
+
+@forecast_bp.route('/cache')
+def forecast_cache_metrics(station: Union[int,str]):
+    s = find_station(station)
+    if not s:
+        return jsonify({'error' : f'Station not found'}), 404
+
+    return jsonify(s.forecast_cache_metrics()), 200
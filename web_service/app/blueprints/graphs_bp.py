@@ -1,13 +1,116 @@
-from flask import Blueprint, Response, jsonify
-from web_service.utils.ws_helper_functions import find_station
+from flask import Blueprint, Response, jsonify, request
+from web_service.utils.ws_helper_functions import find_station, handle_date
 from typing import Union
-import io
+import json
 from web_service.classes.graphs.graph_types import GraphType
+from web_service.classes.graphs.downsampling import METHODS
+from web_service.classes.graphs.graph_cache import graph_cache
+from web_service.classes.graphs.rendering import render_pool
 from web_service.mongo.connect import stations
 
 
 graph_bp = Blueprint('graphs',__name__, url_prefix='/stations/<station>/graphs')
 
+FIGSIZE = (10, 10)
+
+
+def graph_options():
+    # ?start=...&end=... as '%Y-%m-%d %H:%M:%S', the whole history if missing,
+    # ?downsampling=lttb|minmax|none for line plots, ?format=png|json
+    start, end = request.args.get('start'), request.args.get('end')
+    downsampling = request.args.get('downsampling', 'lttb').lower()
+    if downsampling != 'none' and downsampling not in METHODS:
+        raise ValueError(f'unknown downsampling {downsampling}')
+    fmt = request.args.get('format', 'png').lower()
+    if fmt not in ('png', 'json'):
+        raise ValueError(f'unknown format {fmt}')
+
+    return (handle_date(start) if start else None, handle_date(end) if end else None,
+            None if downsampling == 'none' else downsampling, fmt)
+
+
+def _plain(values):
+    # NaN is not JSON
+    if values is None:
+        return None
+    return [None if value is None or value != value else float(value) for value in values]
+
+
+def graph_data(s, graph_type : str, pins : tuple, start_date, end_date, downsampling) -> dict:
+    # what the graph draws, already downsampled or summarized, for clients drawing it themselves
+    data = {'type': graph_type, 'pins': list(pins)}
+
+    if graph_type == 'boxplot':
+        data['boxplot'] = s.box_summary(pins[0], start_date, end_date)
+    elif graph_type == 'histogram':
+        data['histogram'] = s.histogram_summary(pins[0], start_date, end_date)
+    elif graph_type == 'scatterplot':
+        x, y = s.scatter_data(pins[0], pins[1], FIGSIZE, start_date, end_date)
+        data['x'], data['y'] = _plain(x), _plain(y)
+    elif graph_type == 'lineplot':
+        values, ts, values2 = s.line_data(pins[0], pins[1] if len(pins) > 1 else None, FIGSIZE, start_date,
+                                          end_date, downsampling)
+        data['ts'] = [el.isoformat() for el in ts] if ts is not None else None
+        data['series'] = {pins[0]: _plain(values)}
+        if len(pins) > 1:
+            data['series'][pins[1]] = _plain(values2)
+
+    return data
+
+
+def png_response(s, key : tuple, render):
+    # render() draws the figure, in the render pool
+    return cached_response(s, key, lambda: render_pool.render(render), 'image/png')
+
+
+def json_response(s, key : tuple, *graph):
+    # graph: the arguments of graph_data after the station
+    return cached_response(s, key, lambda: json.dumps(graph_data(s, *graph)).encode(), 'application/json')
+
+
+def cached_response(s, key : tuple, content, mimetype : str):
+    # content() makes the bytes. They are made again only after a write to the station,
+    # the ETag lets the clients revalidate what they have with If-None-Match and get a 304
+    tag = s.version     # read before drawing
+    cached = graph_cache.get(key, tag)
+
+    if cached is None:
+        try:
+            body = content()
+        except Exception as e:
+            return jsonify({'error': f"Error during graph generation {e}"}), 500
+        cached = graph_cache.put(key, tag, body, mimetype.split('/')[1])     # png or json on disk
+
+    etag, body = cached
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@graph_bp.route('/summary/<pin>')
+def graph_summary(station : Union[str,int], pin : str):
+    # what the histogram and the box plot of the pin draw, for clients drawing them themselves
+    s = find_station(station)
+    if not s:
+        return jsonify({'error' : f'Station not found'}), 404
+
+    try:
+        pins = stations.find_one({'_id': s.id}, {'available_data': 1, '_id': 0})['available_data']
+    except KeyError:
+        return jsonify({'error': 'Data not found. Station might not store data.'}), 404
+
+    if pin not in pins:
+        return jsonify({'error': 'Pin not found'}), 400
+
+    try:
+        start_date, end_date, _, _ = graph_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'histogram': s.histogram_summary(pin, start_date, end_date),
+                    'boxplot': s.box_summary(pin, start_date, end_date)}), 200
+
 
 @graph_bp.route('/<graph_type>/<pin>')
 def plot_graph_1var(station : Union[str,int], graph_type : str, pin : str):
@@ -28,36 +131,24 @@ def plot_graph_1var(station : Union[str,int], graph_type : str, pin : str):
     if pin not in pins:
         return jsonify({'error': 'Pin not found'}), 400
 
+    try:
+        start_date, end_date, downsampling, fmt = graph_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    key = (s.id, graph_type, (pin,), FIGSIZE, start_date, end_date, downsampling, fmt)
+    if fmt == 'json':
+        return json_response(s, key, graph_type, (pin,), start_date, end_date, downsampling)
+
     if graph_type == 'boxplot':
-        try:
-            graph = s.box_plot(pin)
-            img = io.BytesIO()
-            graph.savefig(img, format='png')
-            img.seek(0)
-            return Response(img.getvalue(), mimetype='image/png')
-        except Exception as e:
-            return jsonify({'error': f"Error during graph generation {e}"}), 500
+        return png_response(s, key, lambda: s.box_plot(pin, FIGSIZE, start_date, end_date))
 
     if graph_type == 'histogram':
-        try:
-            graph = s.histogram(pin)
-            img = io.BytesIO()
-            graph.savefig(img, format='png')
-            img.seek(0)
-            return Response(img.getvalue(), mimetype='image/png')
-        except Exception as e:
-            return jsonify({'error': f"Error during graph generation {e}"}), 500
+        return png_response(s, key, lambda: s.histogram(pin, FIGSIZE, start_date, end_date))
 
     if graph_type == 'lineplot':
-        try:
-            line_plot = s.line_plot(pin)
-            fig = line_plot.plot_graph()
-            img = io.BytesIO()
-            fig.savefig(img, format='png')
-            img.seek(0)
-            return Response(img.getvalue(), mimetype='image/png')
-        except Exception as e:
-            return jsonify({'error': f"Error during graph generation {e}"}), 500
+        return png_response(s, key, lambda: s.line_plot(pin, None, FIGSIZE, start_date, end_date,
+                                                        downsampling).plot_graph())
 
     return jsonify({'error': 'Graph type not supported'}), 400
 
@@ -81,23 +172,18 @@ def plot_graph_2var(station : Union[str,int], graph_type : str, pin1 : str, pin2
     if pin1 not in pins or pin2 not in pins:
         return jsonify({'error': 'Pin not found'}), 400
 
+    try:
+        start_date, end_date, downsampling, fmt = graph_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    key = (s.id, graph_type, (pin1, pin2), FIGSIZE, start_date, end_date, downsampling, fmt)
+    if fmt == 'json':
+        return json_response(s, key, graph_type, (pin1, pin2), start_date, end_date, downsampling)
+
     if graph_type == 'scatterplot':
-        try:
-            graph = s.scatter_plot(pin1, pin2)
-            img = io.BytesIO()
-            graph.savefig(img, format='png')
-            img.seek(0)
-            return Response(img.getvalue(), mimetype='image/png')
-        except Exception as e:
-            return jsonify({'error': f"Error during graph generation {e}"}), 500
+        return png_response(s, key, lambda: s.scatter_plot(pin1, pin2, FIGSIZE, start_date, end_date))
 
     if graph_type == 'lineplot':
-        try:
-            line_plot = s.line_plot(pin1, pin2)
-            fig = line_plot.plot_graph()
-            img = io.BytesIO()
-            fig.savefig(img, format='png')
-            img.seek(0)
-            return Response(img.getvalue(), mimetype='image/png')
-        except Exception as e:
-            return jsonify({'error': f"Error during graph generation {e}"}), 500
+        return png_response(s, key, lambda: s.line_plot(pin1, pin2, FIGSIZE, start_date, end_date,
+                                                        downsampling).plot_graph())
@@ -1,11 +1,111 @@
-from flask import Blueprint, request, jsonify
-from typing import Union
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from datetime import datetime
+from typing import Dict, Iterable, Union
 from web_service.utils.ws_helper_functions import find_station, handle_date, MongoFilterer
+from web_service.utils.columnar_export import COLUMNAR_FORMATS, columnar_available, cursor_to_table, table_to_bytes
 
 # un sample è una misurazione associata a una data
 samples_bp = Blueprint('sample', __name__, url_prefix="/stations/<station>/samples")
 
 
+# ?limit=<n>&after=<ts> pages through the samples sorted by date, the ts to use for the next page
+# is sent in the X-Next-After header (missing on the last page). The cursor keeps the microseconds,
+# a truncated one would send again the samples of the same second
+def next_after(ts : datetime):
+    return ts.isoformat(sep=' ', timespec='microseconds')
+
+
+def pagination(query_dict : Dict):
+    limit = query_dict.pop('limit', [None])[0]
+    after = query_dict.pop('after', [None])[0]
+
+    if limit is not None:
+        limit = int(limit)
+        if limit <= 0:
+            raise ValueError('limit must be positive')
+    if after is not None:
+        after = datetime.fromisoformat(after)   # also reads the '%Y-%m-%d %H:%M:%S' dates
+
+    return limit, after
+
+
+def page_response(result, limit : int):
+    if result is None:
+        result = []
+
+    response = jsonify(result)
+    if limit and len(result) == limit:
+        response.headers['X-Next-After'] = next_after(result[-1]['ts'])
+
+    return response, 200
+
+
+# ?format=ndjson (one sample per line) or ?format=json-stream (a JSON array) send the samples while they are
+# read from the cursor, so the memory used doesn't depend on the size of the range
+STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'json-stream': 'application/json'}
+
+
+def output_format(query_dict : Dict):
+    fmt = query_dict.pop('format', ['json'])[0].lower()
+    if fmt != 'json' and fmt not in STREAM_FORMATS and fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f'unknown format {fmt}')
+    return fmt
+
+
+def stream_response(cursor : Iterable[Dict], fmt : str, chunk_size : int = 500):
+    dumps = current_app.json.dumps   # same serialization as jsonify
+
+    def generate():
+        chunk = []
+        first = True
+        if fmt == 'json-stream':
+            yield '['
+
+        for doc in cursor:
+            chunk.append(dumps(doc))
+            if len(chunk) == chunk_size:
+                yield encode(chunk, first)
+                chunk, first = [], False
+
+        if chunk:
+            yield encode(chunk, first)
+        if fmt == 'json-stream':
+            yield ']'
+
+    def encode(chunk, first):
+        if fmt == 'ndjson':
+            return '\n'.join(chunk) + '\n'
+        return ('' if first else ',') + ','.join(chunk)
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[fmt]), 200
+
+
+# ?format=arrow (IPC stream) or ?format=parquet send the samples as a columnar table
+def columnar_response(cursor : Iterable[Dict], fmt : str):
+    if not columnar_available():
+        return jsonify({'error' : f'Format {fmt} requires pyarrow on the server'}), 501
+
+    return Response(table_to_bytes(cursor_to_table(cursor), fmt), mimetype=COLUMNAR_FORMATS[fmt]), 200
+
+
+def cursor_response(cursor : Iterable[Dict], fmt : str, limit : int = None):
+    if limit is None:
+        if fmt in STREAM_FORMATS:
+            return stream_response(cursor, fmt)
+        return columnar_response(cursor, fmt)
+
+    # a page holds at most limit samples, they are read first to know the cursor of the next page
+    page = list(cursor)
+    if fmt in STREAM_FORMATS:
+        response, code = stream_response(page, fmt)
+    else:
+        response, code = columnar_response(page, fmt)
+
+    if code == 200 and len(page) == limit:
+        response.headers['X-Next-After'] = next_after(page[-1]['ts'])
+    return response, code
+
+
 @samples_bp.route('/')
 def get_all_samples(station: Union[int,str]):
     query_dict = request.args.to_dict(flat = False)
@@ -13,8 +113,21 @@ def get_all_samples(station: Union[int,str]):
     if not s:
         return jsonify({'error' : f'Station not found'}), 404
 
+    try:
+        limit, after = pagination(query_dict)
+        fmt = output_format(query_dict)
+    except ValueError as e:
+        return jsonify({'error' : f'Invalid parameters: {e}'}), 400
+    paginated = limit is not None or after is not None
+
     if len(query_dict) == 0:
-        return jsonify(s.get_measurements_by_date_range()), 200
+        if fmt != 'json':
+            return cursor_response(s.iter_measurements_by_date_range(limit=limit, after=after), fmt, limit)
+
+        result = s.get_measurements_by_date_range(limit=limit, after=after)
+        if paginated:
+            return page_response(result, limit)
+        return jsonify(result), 200
 
     filterer = MongoFilterer(query_dict)
     filters = {}
@@ -22,7 +135,12 @@ def get_all_samples(station: Union[int,str]):
     for key in query_dict.keys():
         filters[key] = filterer.filter_by_key(key)
 
-    result = s.get_measurement_mongo_filtered(filters)
+    if fmt != 'json':
+        return cursor_response(s.iter_measurement_mongo_filtered(filters, limit=limit, after=after), fmt, limit)
+
+    result = s.get_measurement_mongo_filtered(filters, limit=limit, after=after)
+    if paginated:
+        return page_response(result, limit)
     if result:
         return jsonify(result), 200
     return jsonify({'error' : f'Station not found'}), 404
@@ -62,6 +180,8 @@ def sample_by_date(station: Union[int,str], date : str):
 
     elif request.method == 'PATCH':
         result = s.update_measurement_field_by_date(date, **params)
+        if result == 400:
+            return jsonify({'error' : f'Sample associated to datetime {params.get("value")} already present.'}), 400
 
     if not result:
         return jsonify({'error' : f'Sample associated to {date} not found'}), 404
@@ -78,7 +198,19 @@ def samples_by_date_range(station: Union[int,str], start_date : str, end_date :
     start_date = handle_date(start_date)
     end_date = handle_date(end_date)
 
-    result = s.get_measurements_by_date_range(start_date,end_date)
+    query_dict = request.args.to_dict(flat = False)
+    try:
+        limit, after = pagination(query_dict)
+        fmt = output_format(query_dict)
+    except ValueError as e:
+        return jsonify({'error' : f'Invalid parameters: {e}'}), 400
+
+    if fmt != 'json':
+        return cursor_response(s.iter_measurements_by_date_range(start_date, end_date, limit=limit, after=after), fmt, limit)
+
+    result = s.get_measurements_by_date_range(start_date,end_date, limit=limit, after=after)
+    if limit is not None or after is not None:
+        return page_response(result, limit)
     if result:
         return jsonify(result), 200
 
@@ -24,13 +24,7 @@ def get_statistics(station: Union[int,str]):
     query_dict = request.args.to_dict(flat=False)
 
     if len(query_dict) == 0:
-        return jsonify({f'{pin}' :
-                    {'mean': s.mean(pin),
-                     'max': s.max(pin),
-                     'min': s.min(pin),
-                     'stdev': s.std(pin)}
-                for pin in pins}), 200
-
+        return jsonify(s.all_statistics(pins)), 200
 
     stat_type = query_dict['stat-type'][0].lower()
     pin = query_dict['pin'][0]
@@ -75,12 +69,7 @@ def get_statistic_of_pin_filtered(station: Union[int, str],start_date : str, end
     end_date = handle_date(end_date)
 
     if len(query_dict) == 0:
-        return {f'{pin}' :
-                    {'mean': s.mean(pin, start_date, end_date),
-                     'max': s.max(pin, start_date, end_date),
-                     'min': s.min(pin, start_date, end_date),
-                     'stdev': s.std(pin, start_date, end_date)}
-                for pin in pins}, 200
+        return jsonify(s.all_statistics(pins, start_date, end_date)), 200
 
     stat_type = query_dict['stat-type'][0].lower()
     pin = query_dict['pin'][0]
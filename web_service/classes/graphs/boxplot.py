@@ -1,22 +1,19 @@
 from .graph import Graph
-from typing import Tuple
-from seaborn import boxplot
-from matplotlib.pyplot import figure, gca
+from typing import Dict, Tuple
 
 
 class Boxplot(Graph):
-    def __init__(self, data, type_measurements: str, figsize: Tuple[int ,int] = (10, 10)):
+    def __init__(self, data: Dict, type_measurements: str, figsize: Tuple[int ,int] = (10, 10)):
+        # data: the box_summary of the samples
         Graph.__init__(self, data, type_measurements, figsize )
 
     def plot_graph(self):
-        fig = figure(figsize=self.figsize)
-        boxplot(data=self.data)
+        if self.data['n']:
+            self.ax.bxp([dict(self.data, label=self.type_measurements)], patch_artist=True,
+                        boxprops={'facecolor': 'tab:blue'}, medianprops={'color': 'black'})
 
-        ax = gca()
-
-        ax.set_title(f"Box plot of: {self.type_measurements}")
-        ax.set_ylabel(f"{self.type_measurements}")
-
-        return fig
+        self.ax.set_title(f"Box plot of: {self.type_measurements}")
+        self.ax.set_ylabel(f"{self.type_measurements}")
 
+        return self.fig
 
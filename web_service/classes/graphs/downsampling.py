@@ -0,0 +1,108 @@
+import numpy as np
+from matplotlib import rcParams
+from typing import Sequence, Tuple
+
+
+# Fewer points for line plots, chosen so that the picture stays the same: a figure cannot show more points
+# than it is pixels wide. Both methods return the sorted indexes of the samples to keep, the first and last
+# sample are always kept.
+# lttb (largest triangle three buckets) keeps in every bucket the point making the largest triangle with the
+# previous kept point and the mean of the next bucket, it follows the shape of the series.
+# minmax keeps the lowest and the highest point of every bucket, no peak is lost.
+# For scatter plots scatter_points keeps one point per pixel.
+
+def figure_points(figsize : Tuple[int, int], dpi : float = None, axis : int = 0) -> int:
+    # pixels in the width (axis 0) or the height (axis 1) of a figure
+    return int(figsize[axis] * (dpi or rcParams['figure.dpi']))
+
+
+def _as_float(x) -> np.ndarray:
+    x = np.asarray(x)
+    if x.dtype.kind in 'OM':    # datetimes
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb(x, y, n_out : int) -> np.ndarray:
+    x, y = _as_float(x), np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x, mean_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        # twice the area of the triangles, the constant factor does not change the largest
+        area = np.abs((x[previous] - mean_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+
+    return kept
+
+
+def min_max(y, n_buckets : int) -> np.ndarray:
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+
+    # equal buckets, the last one padded
+    size = -(-n // n_buckets)
+    rows = -(-n // size)
+    lows = np.full(rows * size, np.inf)
+    highs = np.full(rows * size, -np.inf)
+    lows[:n] = np.where(np.isnan(y), np.inf, y)
+    highs[:n] = np.where(np.isnan(y), -np.inf, y)
+
+    offsets = np.arange(rows) * size
+    kept = np.concatenate([[0, n - 1], offsets + lows.reshape(rows, size).argmin(axis=1),
+                           offsets + highs.reshape(rows, size).argmax(axis=1)])
+
+    return np.unique(np.minimum(kept, n - 1))
+
+
+METHODS = {'lttb', 'minmax'}
+
+
+def downsample(x, ys : Sequence, n_points : int, method : str = 'lttb') -> np.ndarray:
+    # indexes to keep so that every series of ys, all against x, keeps its shape in n_points pixels.
+    # Samples where a series is NaN are left out of its selection
+    if method not in METHODS:
+        raise ValueError(f'unknown downsampling method {method}')
+
+    x = _as_float(x)
+    kept = []
+    for y in ys:
+        y = np.asarray(y, dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(y))
+        if method == 'lttb':
+            kept.append(valid[lttb(x[valid], y[valid], n_points)])
+        else:
+            kept.append(valid[min_max(y[valid], n_points)])
+
+    return np.unique(np.concatenate(kept)) if kept else np.arange(len(x))
+
+
+def scatter_points(x, y, width : int, height : int) -> np.ndarray:
+    # indexes of one point per pixel of a width x height grid over the data, the first one in it.
+    # Points where x or y is NaN are left out
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(valid) == 0:
+        return valid
+
+    def pixel(values, size):
+        span = np.ptp(values) or 1.0
+        return ((values - values.min()) / span * (size - 1)).astype(np.int64)
+
+    _, first = np.unique(pixel(y[valid], height) * width + pixel(x[valid], width), return_index=True)
+    return valid[np.sort(first)]
@@ -1,5 +1,5 @@
 from abc import ABC,abstractmethod
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from typing import Iterable,Tuple
 
 
@@ -7,7 +7,9 @@ class Graph(ABC):
     def __init__(self, data, type_measurements: str, figsize: Tuple[int ,int] = (10 ,10)):
         self.__data = data
         self.__figsize = figsize
-        self.__fig, self.__ax = plt.subplots()
+        # not registered in pyplot: nothing global keeps it alive or is shared with other threads
+        self.__fig = Figure(figsize=figsize)
+        self.__ax = self.__fig.subplots()
         self.__type_measurements = type_measurements
 
     @property
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Tuple, Union
+from web_service.utils.config import GRAPH_CACHE_SIZE, GRAPH_CACHE_PATH, GRAPH_CACHE_FILES
+
+
+# Rendered graphs, keyed by what was drawn (station, type, pins, size, range...) and tagged with the version of the
+# station collection they were drawn from: an entry with another tag is a miss, so every write to the station
+# makes its graphs be drawn again. The bytes are addressed by their sha256, which is also the ETag of the response.
+# With a path the graphs are also kept on disk as <path>/<sha256>.<extension> (png, or json for the graph data), with
+# <path>/keys/<sha256 of the key>.json pointing to them, so they survive restarts and are shared by the workers;
+# the least recently used files are removed beyond max_files.
+
+class GraphCache:
+    def __init__(self, max_entries : int = GRAPH_CACHE_SIZE, path : str = GRAPH_CACHE_PATH,
+                 max_files : int = GRAPH_CACHE_FILES):
+        self.__max_entries = max_entries
+        self.__path = path
+        self.__max_files = max_files
+        self.__entries = OrderedDict()   # key : (tag, etag, bytes)
+        self.__lock = Lock()
+
+        if path is not None:
+            os.makedirs(os.path.join(path, 'keys'), exist_ok=True)
+
+    def get(self, key : tuple, tag : int) -> Union[Tuple[str, bytes], None]:
+        # (etag, bytes) or None
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] == tag:
+                self.__entries.move_to_end(key)
+                return entry[1:]
+
+        entry = self._read(key, tag)
+        if entry is not None:
+            self._keep(key, tag, *entry)
+        return entry
+
+    def put(self, key : tuple, tag : int, content : bytes, extension : str = 'png') -> Tuple[str, bytes]:
+        etag = hashlib.sha256(content).hexdigest()
+        self._keep(key, tag, etag, content)
+        if self.__path is not None:
+            self._write(key, tag, etag, content, extension)
+
+        return etag, content
+
+    def _keep(self, key : tuple, tag : int, etag : str, content : bytes):
+        with self.__lock:
+            self.__entries[key] = (tag, etag, content)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_entries:
+                self.__entries.popitem(last=False)
+
+    def _key_path(self, key : tuple) -> str:
+        return os.path.join(self.__path, 'keys', hashlib.sha256(repr(key).encode()).hexdigest() + '.json')
+
+    def _read(self, key : tuple, tag : int) -> Union[Tuple[str, bytes], None]:
+        if self.__path is None:
+            return None
+
+        try:
+            with open(self._key_path(key)) as f:
+                pointer = json.load(f)
+            if pointer['tag'] != tag:
+                return None
+
+            content_path = os.path.join(self.__path, f"{pointer['etag']}.{pointer['extension']}")
+            with open(content_path, 'rb') as f:
+                content = f.read()
+            os.utime(content_path)    # recently used
+        except (OSError, ValueError, KeyError):     # never written, removed or being replaced
+            return None
+
+        return pointer['etag'], content
+
+    def _write(self, key : tuple, tag : int, etag : str, content : bytes, extension : str):
+        # written aside and renamed, a reader never sees half a file
+        content_path = os.path.join(self.__path, f'{etag}.{extension}')
+        if not os.path.exists(content_path):
+            self._replace(content_path, content)
+        self._replace(self._key_path(key), json.dumps({'tag': tag, 'etag': etag, 'extension': extension}).encode())
+        self._prune()
+
+    @staticmethod
+    def _replace(path : str, content : bytes):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _prune(self):
+        # every cached file counts, whatever its extension (the pointers are in keys/, the .tmp are being written)
+        files = [entry for entry in os.scandir(self.__path) if entry.is_file() and not entry.name.endswith('.tmp')]
+        if len(files) <= self.__max_files:
+            return
+
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.__max_files]:
+            try:
+                os.remove(entry.path)   # the keys pointing to it become misses
+            except OSError:
+                pass
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+
+graph_cache = GraphCache()
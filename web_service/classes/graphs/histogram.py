@@ -1,20 +1,20 @@
 from .graph import Graph
-from typing import Tuple
-from seaborn import histplot
-from matplotlib.pyplot import figure, gca
+from typing import Dict, Tuple
 
 
 class Histogram(Graph):
-    def __init__(self, data, type_measurements: str, figsize: Tuple[int ,int] = (10, 10)):
+    def __init__(self, data: Dict, type_measurements: str, figsize: Tuple[int ,int] = (10, 10)):
+        # data: the histogram_summary of the samples
         Graph.__init__(self, data, type_measurements, figsize)
 
     def plot_graph(self):
-        fig = figure(figsize=self.figsize)
-        histplot(data=self.data, kde= True)
+        if self.data['n']:
+            self.ax.stairs(self.data['counts'], self.data['edges'], fill=True, alpha=0.5, color='tab:blue')
+            self.ax.stairs(self.data['counts'], self.data['edges'], color='tab:blue')
+            self.ax.plot(self.data['kde_x'], self.data['kde_y'], color='tab:blue')
 
-        ax = gca()
+        self.ax.set_title(f"Histogram of: {self.type_measurements}")
+        self.ax.set_xlabel(f"{self.type_measurements}")
+        self.ax.set_ylabel("Count")
 
-        ax.set_title(f"Histogram of: {self.type_measurements}")
-        ax.set_xlabel(f"{self.type_measurements}")
-
-        return fig
+        return self.fig
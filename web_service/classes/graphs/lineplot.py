@@ -1,8 +1,6 @@
 from .graph import Graph
 from typing import Tuple
 from seaborn import lineplot
-from matplotlib.pyplot import figure, gca
-import matplotlib.pyplot as plt
 
 
 class LinePlot(Graph):
@@ -14,10 +12,8 @@ class LinePlot(Graph):
         self.type_measurements3 = type_measurements3
 
     def plot_graph(self):
-        fig = figure(figsize=self.figsize)
-        lineplot(x=self.data2, y=self.data)
+        ax1 = self.ax
         if self.data3 is not None and self.type_measurements3 is not None:
-            fig, ax1 = plt.subplots(figsize=self.figsize)
             ax2 = ax1.twinx()
 
             line1 = ax1.plot(self.data2, self.data, label=self.type_measurements)
@@ -33,12 +29,12 @@ class LinePlot(Graph):
 
             ax1.set_title(f"Line plot of: {self.type_measurements} and {self.type_measurements3}")
 
-            return fig
+            return self.fig
 
-        ax = gca()
+        lineplot(x=self.data2, y=self.data, estimator=None, ax=ax1)   # one point per ts, nothing to aggregate
 
-        ax.set_title(f"line plot of: {self.type_measurements}")
-        ax.set_ylabel(f"{self.type_measurements}")
-        ax.set_xlabel("Time")
+        ax1.set_title(f"line plot of: {self.type_measurements}")
+        ax1.set_ylabel(f"{self.type_measurements}")
+        ax1.set_xlabel("Time")
 
-        return fig
\ No newline at end of file
+        return self.fig
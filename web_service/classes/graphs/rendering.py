@@ -0,0 +1,35 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+from typing import Callable
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from web_service.utils.config import RENDER_WORKERS, RENDER_QUEUE
+
+
+def render_png(fig : Figure) -> bytes:
+    # draws the figure with Agg and frees it, the figure cannot be used afterwards
+    try:
+        img = io.BytesIO()
+        FigureCanvasAgg(fig).print_png(img)
+        return img.getvalue()
+    finally:
+        fig.clear()
+
+
+# Graphs are drawn by max_workers threads, each one on its own Figure (the graph classes do not use pyplot, whose
+# global state is not thread safe). At most max_pending renders are queued or running, the others wait to be
+# queued: the memory taken by figures and their data stays bounded however many requests come.
+
+class RenderPool:
+    def __init__(self, max_workers : int = RENDER_WORKERS, max_pending : int = RENDER_QUEUE):
+        self.__pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='render')
+        self.__slots = BoundedSemaphore(max_workers + max_pending)
+
+    def render(self, draw : Callable[[], Figure]) -> bytes:
+        # draw() builds the figure, the png is returned once it is rendered. Raises what draw raises
+        with self.__slots:
+            return self.__pool.submit(lambda: render_png(draw())).result()
+
+
+render_pool = RenderPool()
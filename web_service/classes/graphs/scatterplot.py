@@ -1,7 +1,6 @@
 from .graph import Graph
 from typing import Tuple
 from seaborn import scatterplot
-from matplotlib.pyplot import figure, gca
 
 
 class ScatterPlot(Graph):
@@ -11,12 +10,10 @@ class ScatterPlot(Graph):
         self.type_measurements2 = type_measurements2
 
     def plot_graph(self):
-        fig = figure(figsize=self.figsize)
-        scatterplot(x=self.data, y=self.data2)
-        ax = gca()
+        scatterplot(x=self.data, y=self.data2, ax=self.ax)
 
-        ax.set_title(f"Scatter plot of: {self.type_measurements} and {self.type_measurements2}")
-        ax.set_xlabel(f"{self.type_measurements}")
-        ax.set_ylabel(f"{self.type_measurements2}")
+        self.ax.set_title(f"Scatter plot of: {self.type_measurements} and {self.type_measurements2}")
+        self.ax.set_xlabel(f"{self.type_measurements}")
+        self.ax.set_ylabel(f"{self.type_measurements2}")
 
-        return fig
+        return self.fig
@@ -0,0 +1,66 @@
+import numpy as np
+from typing import Dict, Union
+
+
+# What the histogram and the box plot draw, computed in a few vectorized passes over the samples of a pin
+# instead of handing every sample to seaborn. The results are plain lists so they can be sent as JSON.
+
+MAX_BINS = 200      # numpy's 'auto' rule gives more and more bins as the history grows
+KDE_GRID = 512      # points of the density curve
+
+
+def _finite(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return values[np.isfinite(values)]
+
+
+def histogram_summary(values, bins : Union[int, str] = 'auto') -> Dict:
+    # bin edges and counts, and the density curve in counts (as seaborn draws it on a histogram)
+    values = _finite(values)
+    if len(values) == 0:
+        return {'n': 0, 'edges': [], 'counts': [], 'kde_x': [], 'kde_y': []}
+
+    edges = np.histogram_bin_edges(values, bins)
+    if len(edges) - 1 > MAX_BINS:
+        edges = np.histogram_bin_edges(values, MAX_BINS)
+    counts, edges = np.histogram(values, edges)
+    kde_x, kde_y = binned_kde(values)
+
+    return {'n': len(values), 'edges': edges.tolist(), 'counts': counts.tolist(), 'kde_x': kde_x.tolist(),
+            'kde_y': (kde_y * len(values) * (edges[1] - edges[0])).tolist()}
+
+
+def binned_kde(values : np.ndarray, grid_size : int = KDE_GRID):
+    # gaussian kde with Scott's bandwidth, over the data range. The samples are first counted on a fine grid
+    # and the counts convolved with the kernel: O(n + grid * kernel) instead of O(n * grid)
+    n = len(values)
+    std = values.std(ddof=1) if n > 1 else 0.0
+    if std == 0:
+        return np.empty(0), np.empty(0)
+
+    bandwidth = std * n ** (-1 / 5)
+    counts, edges = np.histogram(values, grid_size)
+    step = edges[1] - edges[0]
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    half = min(int(np.ceil(4 * bandwidth / step)), grid_size - 1)    # the kernel is negligible beyond 4 sd
+    kernel = np.exp(-0.5 * (np.arange(-half, half + 1) * step / bandwidth) ** 2)
+    density = np.convolve(counts, kernel)[half:half + grid_size] / (n * bandwidth * np.sqrt(2 * np.pi))
+
+    return centers, density
+
+
+def box_summary(values, whis : float = 1.5) -> Dict:
+    # quartiles, whiskers at the furthest samples within whis * IQR of the box and the distinct samples beyond
+    # them, as matplotlib's Axes.bxp takes them
+    values = _finite(values)
+    if len(values) == 0:
+        return {'n': 0, 'q1': None, 'med': None, 'q3': None, 'whislo': None, 'whishi': None, 'fliers': []}
+
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)]
+    fliers = np.unique(values[(values < inside.min()) | (values > inside.max())])
+
+    return {'n': len(values), 'q1': float(q1), 'med': float(med), 'q3': float(q3), 'whislo': float(inside.min()),
+            'whishi': float(inside.max()), 'fliers': fliers.tolist()}
@@ -0,0 +1,36 @@
+from typing import Dict, Iterable
+from .statistics_type import StatType
+
+
+class MongoStatistics:
+    # accumulators used in a $group stage to compute the statistics inside mongo
+    OPERATORS = {StatType.MEAN: '$avg',
+                 StatType.MAX: '$max',
+                 StatType.MIN: '$min',
+                 StatType.STD: '$stdDevPop'}
+
+    @staticmethod
+    def _key(pin: str, stat_type: StatType):
+        return f'{pin}__{stat_type.name.lower()}'
+
+    @staticmethod
+    def group_stage(pins: Iterable[str], stat_types: Iterable[StatType] = tuple(StatType)) -> Dict:
+        group = {'_id': None}
+        for pin in pins:
+            for stat_type in stat_types:
+                group[MongoStatistics._key(pin, stat_type)] = {MongoStatistics.OPERATORS[stat_type]: f'${pin}'}
+
+        return {'$group': group}
+
+    @staticmethod
+    def pipeline(mongo_filter: Dict, pins: Iterable[str], stat_types: Iterable[StatType] = tuple(StatType)):
+        return [{'$match': mongo_filter}, MongoStatistics.group_stage(pins, stat_types)]
+
+    @staticmethod
+    def unpack(document: Dict, pins: Iterable[str], stat_types: Iterable[StatType] = tuple(StatType)):
+        # {pin : {stat_type : value}}, values are None if mongo returned no group (empty range)
+        if document is None:
+            document = {}
+
+        return {pin: {stat_type: document.get(MongoStatistics._key(pin, stat_type)) for stat_type in stat_types}
+                for pin in pins}
@@ -0,0 +1,40 @@
+import numpy as np
+
+
+# vectorized counterpart of Statistics, missing values are expected as NaN and are skipped.
+# a column without any value gives None, like the other backends do for an empty range
+
+class NumpyStatistics:
+
+    @staticmethod
+    def _valid(feature_array):
+        feature_array = np.asarray(feature_array, dtype=np.float64)
+        return feature_array[~np.isnan(feature_array)]
+
+    @staticmethod
+    def get_mean(feature_array):
+        values = NumpyStatistics._valid(feature_array)
+        if values.size == 0:
+            return None
+        return float(np.mean(values))
+
+    @staticmethod
+    def get_max(feature_array):
+        values = NumpyStatistics._valid(feature_array)
+        if values.size == 0:
+            return None
+        return float(np.max(values))
+
+    @staticmethod
+    def get_min(feature_array):
+        values = NumpyStatistics._valid(feature_array)
+        if values.size == 0:
+            return None
+        return float(np.min(values))
+
+    @staticmethod
+    def get_std(feature_array):
+        values = NumpyStatistics._valid(feature_array)
+        if values.size == 0:
+            return None
+        return float(np.std(values))   # population standard deviation, as pstdev
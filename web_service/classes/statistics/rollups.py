@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+from pymongo.collection import Collection
+from .running_statistics import RunningStatistics
+from .statistics_type import StatType
+
+
+# Hourly and daily pre-aggregations of a station collection, stored in station_{id}_1h and station_{id}_1d.
+# A bucket document looks like {'_id': <bucket start>, 'pins': {<pin>: {count, mean, m2, min, max}}}
+# and covers [bucket start, bucket start + size). m2 is the sum of squared deviations from the mean: buckets are
+# combined pairwise from their means and m2 (RunningStatistics.merge), sums of squares would lose the variance of
+# large values with a small spread to cancellation.
+
+class Rollups:
+    GRANULARITIES = {'1h': ('hour', timedelta(hours=1)),
+                     '1d': ('day', timedelta(days=1))}
+
+    MOMENTS = ['count', 'mean', 'm2', 'min', 'max']
+
+    def __init__(self, data: Collection):
+        self.__data = data
+        self.__collections = {name: data.database[f'{data.name}_{name}'] for name in self.GRANULARITIES}
+
+    @property
+    def collections(self):
+        return self.__collections
+
+    @staticmethod
+    def _floor(date: datetime, granularity: str):
+        if granularity == '1h':
+            return date.replace(minute=0, second=0, microsecond=0)
+        return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _ceil(date: datetime, granularity: str):
+        floor = Rollups._floor(date, granularity)
+        if floor == date:
+            return floor
+        return floor + Rollups.GRANULARITIES[granularity][1]
+
+    @staticmethod
+    def _numeric_fields(sample: Dict):
+        return {key: value for key, value in sample.items()
+                if key not in ('_id', 'ts') and isinstance(value, (int, float)) and not isinstance(value, bool)}
+
+    def needs_rebuild(self):
+        # empty, or written before the buckets kept mean and m2 instead of sum and sumsq
+        for coll in self.__collections.values():
+            bucket = coll.find_one({})
+            if bucket is None or any('m2' not in moments for moments in bucket['pins'].values()):
+                return True
+        return False
+
+    # WRITES
+
+    def record(self, sample: Dict):
+        # incremental update for a newly inserted sample
+        fields = self._numeric_fields(sample)
+        if not fields:
+            return
+
+        # a Welford step per pin in an update pipeline, every expression reads the bucket before the update
+        update = {}
+        for pin, value in fields.items():
+            count = {'$ifNull': [f'$pins.{pin}.count', 0]}
+            mean = {'$ifNull': [f'$pins.{pin}.mean', 0]}
+            delta = {'$subtract': [value, mean]}
+            new_count = {'$add': [count, 1]}
+
+            update[f'pins.{pin}.count'] = new_count
+            update[f'pins.{pin}.mean'] = {'$add': [mean, {'$divide': [delta, new_count]}]}
+            update[f'pins.{pin}.m2'] = {'$add': [{'$ifNull': [f'$pins.{pin}.m2', 0]},
+                                                 {'$divide': [{'$multiply': [delta, delta, count]}, new_count]}]}
+            update[f'pins.{pin}.min'] = {'$min': [f'$pins.{pin}.min', value]}    # missing is ignored
+            update[f'pins.{pin}.max'] = {'$max': [f'$pins.{pin}.max', value]}
+
+        for granularity, coll in self.__collections.items():
+            coll.update_one({'_id': self._floor(sample['ts'], granularity)}, [{'$set': update}], upsert=True)
+
+    def refresh(self, date: datetime):
+        # recomputes from the raw samples the buckets containing date, used when a sample is replaced or deleted
+        # (min and max cannot be updated incrementally in that case)
+        for granularity, coll in self.__collections.items():
+            bucket = self._floor(date, granularity)
+            mongo_filter = {'ts': {'$gte': bucket, '$lt': bucket + self.GRANULARITIES[granularity][1]}}
+
+            pins = {el['_id']: {moment: el[moment] for moment in self.MOMENTS}
+                    for el in self.__data.aggregate(self._per_pin_pipeline(mongo_filter))}
+
+            if pins:
+                coll.replace_one({'_id': bucket}, {'pins': pins}, upsert=True)
+            else:
+                coll.delete_one({'_id': bucket})
+
+    def rebuild(self):
+        # recreates both rollup collections from the whole station history
+        for granularity, coll in self.__collections.items():
+            unit = self.GRANULARITIES[granularity][0]
+            pipeline = [{'$addFields': {'bucket': {'$dateTrunc': {'date': '$ts', 'unit': unit}}}}] \
+                + self._per_pin_pipeline(None, group_by={'bucket': '$bucket', 'pin': '$kv.k'}) \
+                + [{'$group': {'_id': '$_id.bucket',
+                               'pins': {'$push': {'k': '$_id.pin',
+                                                  'v': {moment: f'${moment}' for moment in self.MOMENTS}}}}},
+                   {'$project': {'pins': {'$arrayToObject': '$pins'}}},
+                   {'$out': coll.name}]
+
+            self.__data.aggregate(pipeline)
+
+    @staticmethod
+    def _per_pin_pipeline(mongo_filter: Dict = None, group_by='$kv.k') -> List[Dict]:
+        # count/mean/m2/min/max of every numeric field of the matched samples, grouped by field name
+        pipeline = [{'$match': mongo_filter}] if mongo_filter else []
+        pipeline += [{'$addFields': {'kv': {'$objectToArray': '$$ROOT'}}},
+                     {'$unwind': '$kv'},
+                     {'$match': {'kv.k': {'$nin': ['_id', 'ts', 'bucket']}, 'kv.v': {'$type': 'number'}}},
+                     {'$group': {'_id': group_by,
+                                 'count': {'$sum': 1},
+                                 'mean': {'$avg': '$kv.v'},
+                                 'std': {'$stdDevPop': '$kv.v'},     # computed by mongo with Welford's method
+                                 'min': {'$min': '$kv.v'},
+                                 'max': {'$max': '$kv.v'}}},
+                     {'$addFields': {'m2': {'$multiply': ['$std', '$std', '$count']}}}]
+        return pipeline
+
+    # READS
+
+    @staticmethod
+    def _plan(start: datetime, end: datetime, include_end: bool = True, granularity: str = '1d') \
+            -> Tuple[Dict[str, List[Tuple[datetime, datetime]]], List[Dict]]:
+        # splits [start, end] into whole buckets (half open ranges of bucket starts) and raw ts filters for the edges
+        buckets = {name: [] for name in Rollups.GRANULARITIES}
+        finer = '1h' if granularity == '1d' else None
+
+        low, high = Rollups._ceil(start, granularity), Rollups._floor(end, granularity)
+
+        if low >= high:
+            if finer:
+                return Rollups._plan(start, end, include_end, finer)
+            return buckets, [{'$gte': start, '$lte' if include_end else '$lt': end}]
+
+        buckets[granularity].append((low, high))
+        raw = []
+
+        edges = [(start, low, False), (high, end, include_end)]
+        for edge_start, edge_end, edge_inclusive in edges:
+            if edge_start == edge_end and not edge_inclusive:
+                continue
+
+            if finer:
+                edge_buckets, edge_raw = Rollups._plan(edge_start, edge_end, edge_inclusive, finer)
+                for name in Rollups.GRANULARITIES:
+                    buckets[name] += edge_buckets[name]
+                raw += edge_raw
+            else:
+                raw.append({'$gte': edge_start, '$lte' if edge_inclusive else '$lt': edge_end})
+
+        return buckets, raw
+
+    def moments(self, pins: Iterable[str], start: datetime, end: datetime) -> Dict[str, Dict]:
+        # {pin : {count, mean, m2, min, max}} over [start, end], whole buckets are read from the rollups
+        # and only the samples at the edges from the station collection
+        pins = list(pins)
+        result = {pin: RunningStatistics() for pin in pins}
+        if start > end:
+            return {pin: acc.moments() for pin, acc in result.items()}
+
+        buckets, raw = self._plan(start, end)
+
+        # one partial per bucket, merged pairwise
+        partials = []
+        projection = {f'pins.{pin}': 1 for pin in pins}
+        for name, ranges in buckets.items():
+            if ranges:
+                mongo_filter = {'$or': [{'_id': {'$gte': low, '$lt': high}} for low, high in ranges]}
+                partials += [document['pins'] for document in self.__collections[name].find(mongo_filter, projection)]
+
+        if raw:
+            raw_group = {'_id': None}
+            for pin in pins:
+                value = {'$cond': [{'$isNumber': f'${pin}'}, f'${pin}', None]}   # accumulators skip nulls
+                raw_group[f'{pin}__count'] = {'$sum': {'$cond': [{'$isNumber': f'${pin}'}, 1, 0]}}
+                raw_group[f'{pin}__mean'] = {'$avg': value}
+                raw_group[f'{pin}__std'] = {'$stdDevPop': value}
+                raw_group[f'{pin}__min'] = {'$min': value}
+                raw_group[f'{pin}__max'] = {'$max': value}
+
+            mongo_filter = {'$or': [{'ts': ts_range} for ts_range in raw]}
+            document = next(self.__data.aggregate([{'$match': mongo_filter}, {'$group': raw_group}]), None)
+            if document is not None:
+                partials.append({pin: {'count': document[f'{pin}__count'], 'mean': document[f'{pin}__mean'],
+                                       'm2': (document[f'{pin}__std'] or 0) ** 2 * document[f'{pin}__count'],
+                                       'min': document[f'{pin}__min'], 'max': document[f'{pin}__max']}
+                                 for pin in pins})
+
+        for partial in partials:
+            for pin in pins:
+                if partial.get(pin) and partial[pin]['count']:
+                    result[pin].merge(RunningStatistics.from_moments(partial[pin]))
+
+        return {pin: acc.moments() for pin, acc in result.items()}
+
+    @staticmethod
+    def to_statistics(moments: Dict, stat_types: Iterable[StatType] = tuple(StatType)):
+        # {stat_type : value} from the moments of one pin, None if there are no values
+        acc = RunningStatistics.from_moments(moments)
+        return {stat_type: acc.get(stat_type) for stat_type in stat_types}
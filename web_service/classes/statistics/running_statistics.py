@@ -0,0 +1,76 @@
+from math import sqrt
+from typing import Dict
+from .statistics_type import StatType
+
+
+# Welford accumulator, keeps count, mean and sum of squared deviations (M2) so that a new value is added in O(1)
+# and two accumulators are merged in O(1)
+
+class RunningStatistics:
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0, minimum: float = None,
+                 maximum: float = None):
+        self.__count = count
+        self.__mean = mean
+        self.__m2 = m2
+        self.__min = minimum
+        self.__max = maximum
+
+    @staticmethod
+    def from_moments(moments: Dict):
+        # from the {count, mean, m2, min, max} of a Rollups bucket or range
+        if moments['count'] == 0:
+            return RunningStatistics()
+
+        return RunningStatistics(moments['count'], moments['mean'], moments['m2'], moments['min'], moments['max'])
+
+    def moments(self) -> Dict:
+        return {'count': self.__count, 'mean': self.__mean, 'm2': self.__m2, 'min': self.__min, 'max': self.__max}
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def mean(self):
+        return self.__mean if self.__count else None
+
+    @property
+    def std(self):
+        return sqrt(self.__m2 / self.__count) if self.__count else None
+
+    @property
+    def min(self):
+        return self.__min
+
+    @property
+    def max(self):
+        return self.__max
+
+    def push(self, value: float):
+        self.__count += 1
+        delta = value - self.__mean
+        self.__mean += delta / self.__count
+        self.__m2 += delta * (value - self.__mean)
+
+        self.__min = value if self.__min is None else min(self.__min, value)
+        self.__max = value if self.__max is None else max(self.__max, value)
+
+    def merge(self, other: 'RunningStatistics'):
+        # adds the values of other, combining the two means and M2 pairwise (Chan et al.) instead of going
+        # through sums of squares, which lose the variance to cancellation when the mean is large
+        if other.count == 0:
+            return
+        count = self.__count + other.count
+        delta = other.mean - self.__mean
+        self.__mean += delta * other.count / count
+        self.__m2 += other.__m2 + delta * delta * self.__count * other.count / count
+        self.__count = count
+
+        self.__min = other.min if self.__min is None else min(self.__min, other.min)
+        self.__max = other.max if self.__max is None else max(self.__max, other.max)
+
+    def get(self, stat_type: StatType):
+        return {StatType.MEAN: self.mean,
+                StatType.MAX: self.max,
+                StatType.MIN: self.min,
+                StatType.STD: self.std}[stat_type]
@@ -0,0 +1,8 @@
+from enum import Enum, auto
+
+
+class StatBackend(Enum):
+    PYTHON = auto()   # fetches the values and uses the Statistics class
+    MONGO = auto()    # aggregation pipelines, only the results leave the database
+    NUMPY = auto()    # fetches the values as a float64 column and uses the NumpyStatistics class
+    ROLLUP = auto()   # hourly and daily pre-aggregated buckets, raw samples only at the edges of the range
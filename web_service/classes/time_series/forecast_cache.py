@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, List, Union
+from web_service.utils.config import FORECAST_CACHE_SIZE
+
+
+# Forecasts of the models, kept until the model is saved again (trained, fine tuned or updated) or the samples of
+# the station change: each entry is tagged with the version of the saved model and the version of the station
+# collection it was computed with, an entry with another tag is a miss. Hits and misses are counted per station.
+
+class ForecastCache:
+    def __init__(self, max_entries : int = FORECAST_CACHE_SIZE):
+        self.__max_entries = max_entries
+        self.__entries = OrderedDict()   # (station id, model id, single shot) : (tag, rows)
+        self.__counters = {}             # station id : [hits, misses]
+        self.__lock = Lock()
+
+    def get(self, key : tuple, tag : Hashable) -> Union[List[Dict], None]:
+        # the rows are shared between callers and must not be modified
+        with self.__lock:
+            entry = self.__entries.get(key)
+            hit = entry is not None and entry[0] == tag
+            self.__counters.setdefault(key[0], [0, 0])[0 if hit else 1] += 1
+
+            if not hit:
+                return None
+            self.__entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key : tuple, tag : Hashable, rows : List[Dict]):
+        with self.__lock:
+            self.__entries[key] = (tag, rows)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_entries:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, station_id : int, model_id : str = None):
+        # the forecasts of a model, or of all the models of the station if model_id is None
+        with self.__lock:
+            for key in [key for key in self.__entries if key[0] == station_id and model_id in (None, key[1])]:
+                del self.__entries[key]
+
+    def metrics(self, station_id : int) -> Dict:
+        with self.__lock:
+            hits, misses = self.__counters.get(station_id, [0, 0])
+            entries = sum(1 for key in self.__entries if key[0] == station_id)
+
+        return {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses) if hits + misses else None,
+                'entries': entries}
+
+
+forecast_cache = ForecastCache()
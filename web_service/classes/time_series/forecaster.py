@@ -8,28 +8,104 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler
 from .get_dataset import mongo_to_dataframe
-from typing import List
+from web_service.mongo.watermarks import watermarks
+from .windowing import n_windows, window_views, WindowBatches
+from .window_dataset import window_dataset
+from .inference import InferenceEngine
+from web_service.utils.config import INFERENCE_THREADS, QUANTIZE_INFERENCE
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Tuple
+
+
+class _KerasWindowBatches(tf.keras.utils.Sequence):
+    # keras only accepts its own Sequence subclasses
+    def __init__(self, batches : WindowBatches):
+        super().__init__()
+        self.__batches = batches
+
+    def __len__(self):
+        return len(self.__batches)
+
+    def __getitem__(self, idx):
+        return self.__batches[idx]
+
+    def on_epoch_end(self):
+        self.__batches.on_epoch_end()
+
+
+class ProgressCallback(tf.keras.callbacks.Callback):
+    # writes the last finished epoch and its loss to progress[key], progress can be a multiprocessing Manager dict
+    def __init__(self, progress, key : str):
+        super().__init__()
+        self.__progress = progress
+        self.__key = key
+
+    def on_epoch_end(self, epoch, logs=None):
+        loss = (logs or {}).get('loss')
+        self.__progress[self.__key] = {'status': 'running', 'epoch': epoch + 1,
+                                       'loss': None if loss is None else float(loss)}
+
+
+def build_model(input_steps : int, horizon_steps : int, n_input_feats : int, n_features : int,
+                optimizer = 'adam', loss_f = 'huber'):
+    input_shape = (input_steps, n_input_feats)
+    model = tf.keras.models.Sequential()
+    model.add(LSTM(128, return_sequences=True, input_shape=input_shape))
+    model.add(LSTM(128, return_sequences=False))
+    model.add(Dense(horizon_steps * n_features))
+    model.add(Reshape([horizon_steps, n_features]))
+    model.compile(optimizer=optimizer, loss=loss_f, metrics=['mse'])
+    model.build((None, input_shape[0], input_shape[1]))
+
+    return model
+
+
+def fit_model(model, X_series : np.ndarray, y_series : np.ndarray, input_steps : int, horizon_steps : int,
+              epochs : int = 1, batch_size : int = 32, batched : bool = False, streaming : bool = False,
+              shuffle_buffer : int = 1024, cache : str = None, callbacks : List = ()):
+    # batched=True feeds the windows to keras one batch at a time instead of as a single 3D tensor,
+    # streaming=True builds them inside a tf.data pipeline (see window_dataset for shuffle_buffer and cache)
+    callbacks = [tf.keras.callbacks.EarlyStopping(monitor='loss', patience = 2), *callbacks]
+
+    if streaming:
+        dataset = window_dataset(X_series, y_series, input_steps, horizon_steps, batch_size,
+                                 shuffle_buffer=shuffle_buffer, cache=cache)
+        return model.fit(dataset, epochs=epochs, callbacks = callbacks)
+
+    X_train, y_train = window_views(X_series, y_series, input_steps, horizon_steps)
+    if batched:
+        batches = WindowBatches(X_train, y_train, batch_size, shuffle=True)
+        return model.fit(_KerasWindowBatches(batches), epochs=epochs, callbacks = callbacks)
+
+    return model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size, callbacks = callbacks)
 
 
 class Forecaster:
     def __init__(self, station_id : int, input_fields : List[str] = None, output_fields : List[str] = None,
-                 input_steps : int = 300, horizon_steps : int = 250):
+                 input_steps : int = 300, horizon_steps : int = 250, scalers : Tuple = None):
+        # scalers: the fitted (input, output) scalers of a saved model, used instead of fitting new ones
+        self.__weights_lock = Lock()   # background trainings set the weights while predictions may be running
         self.__stat_id = station_id
         self.__input_fields = input_fields
         self.__output_fields = output_fields
         self.__input_steps = input_steps
         self.__horizon_steps = horizon_steps
+        self.__trained_until = None   # ts of the last sample the weights were fitted on
 
         self.__to_update = False
-        self.update_data(self.input_fields, self.__output_fields)
+        self.update_data(self.input_fields, self.__output_fields, scalers)
         self.__to_update = True
 
+        self.__train_series = None
         self.__X_train = None
         self.__y_train = None
         self.__X_test = None
         self.__model = None
         self.__optim=None
         self.__loss=None
+        self.__engine = None   # exported from the model when first needed by a prediction
+        self.__inference = {'quantize': QUANTIZE_INFERENCE, 'num_threads': INFERENCE_THREADS}
 
     @property
     def input_fields(self):
@@ -39,23 +115,62 @@ class Forecaster:
     def output_fields(self):
         return self.__output_fields
 
-    def preprocess(self):
+    @property
+    def scalers(self):
+        return self.__input_normalizer, self.__normalizer_used
+
+    @property
+    def settings(self):
+        # what is needed to create the same forecaster again
+        return {'station_id': self.__stat_id, 'input_fields': self.input_fields, 'output_fields': self.output_fields,
+                'input_steps': self.__input_steps, 'horizon_steps': self.__horizon_steps,
+                'optimizer': self.__optim, 'loss_f': self.__loss,
+                'trained_until': self.__trained_until.isoformat() if self.__trained_until else None,
+                'inference': self.__inference}
+
+    @property
+    def data_version(self):
+        # version of the station collection when the data was loaded
+        return self.__data_version
+
+    @property
+    def trained_until(self):
+        return self.__trained_until
+
+    @classmethod
+    def restore(cls, settings : Dict, scalers : Tuple, weights_path : str):
+        forecaster = cls(settings['station_id'], settings['input_fields'], settings['output_fields'],
+                         settings['input_steps'], settings['horizon_steps'], scalers)
+        forecaster.create_model(settings['optimizer'], settings['loss_f'])
+        forecaster.model.load_weights(weights_path)
+        if settings.get('trained_until'):
+            forecaster.__trained_until = datetime.fromisoformat(settings['trained_until'])
+        forecaster.__inference = settings.get('inference', forecaster.__inference)
+
+        return forecaster
+
+    def preprocess(self, scalers : Tuple = None):
         self.__ts_column = self.__df.pop('ts')
-        input_normalizer = MinMaxScaler()
-        self.__normalizer_used = MinMaxScaler()
+
+        if scalers:
+            self.__input_normalizer, self.__normalizer_used = scalers
+            scale = lambda scaler, frame: scaler.transform(frame)
+        else:
+            self.__input_normalizer, self.__normalizer_used = MinMaxScaler(), MinMaxScaler()
+            scale = lambda scaler, frame: scaler.fit_transform(frame)
 
         if self.output_fields:
-            self.__df[self.output_fields] = self.__normalizer_used.fit_transform(self.__df[self.output_fields])
+            self.__df[self.output_fields] = scale(self.__normalizer_used, self.__df[self.output_fields])
         else:
-            self.__df[self.__df.columns] = self.__normalizer_used.fit_transform(self.__df[self.__df.columns])
+            self.__df[self.__df.columns] = scale(self.__normalizer_used, self.__df[self.__df.columns])
 
         if self.input_fields:
-            self.__df[self.input_fields] = input_normalizer.fit_transform(self.__df[self.input_fields])
+            self.__df[self.input_fields] = scale(self.__input_normalizer, self.__df[self.input_fields])
 
         else:
-            self.__df[self.__df.columns] = input_normalizer.fit_transform(self.__df[self.__df.columns])
+            self.__df[self.__df.columns] = scale(self.__input_normalizer, self.__df[self.__df.columns])
 
-    def update_data(self, input_fields = None, output_fields = None):
+    def update_data(self, input_fields = None, output_fields = None, scalers : Tuple = None):
         if input_fields:
             self.__input_fields = input_fields
         else:
@@ -66,65 +181,154 @@ class Forecaster:
         else:
             self.__output_fields = None
 
-        if not input_fields or not output_fields:
-            to_keep = 'all'
-        else:
-            to_keep = {el: 1 for el in set(self.__input_fields + self.__output_fields)}
-            to_keep['ts']=1
-
-        self.__df = mongo_to_dataframe(self.__stat_id, to_keep)
-        self.preprocess()
+        self.__data_version = watermarks.get(f'station_{self.__stat_id}')[1]
+        self.__df = mongo_to_dataframe(self.__stat_id, self._fields_to_keep())
+        self.preprocess(scalers)
 
         if self.__to_update:
+            self.__trained_until = None
             self.create_model(self.__optim, self.__loss)
 
-    def make_window(self,X, y,input_steps : int, horizon_steps : int):
-        X_res, y_res = [], []
+    def _fields_to_keep(self):
+        if not self.input_fields or not self.output_fields:
+            return 'all'
 
-        for i in range(len(X) - input_steps - horizon_steps + 1):
-            X_res.append(X.iloc[i : i+input_steps].to_numpy())
-            y_res.append(y.iloc[i+input_steps : i+input_steps+horizon_steps])
+        to_keep = {el: 1 for el in set(self.input_fields + self.output_fields)}
+        to_keep['ts']=1
+        return to_keep
 
-        return np.array(X_res), np.array(y_res)
+    def refresh_data(self):
+        # reads the samples added since the data was loaded, normalized with the scalers already fitted
+        data_version = watermarks.get(f'station_{self.__stat_id}')[1]
+        df = mongo_to_dataframe(self.__stat_id, self._fields_to_keep())
+        with self.__weights_lock:    # predictions read the data while holding it
+            self.__data_version = data_version
+            self.__df = df
+            self.preprocess(self.scalers)
+            self.__train_series = self.__X_train = self.__y_train = self.__X_test = None
 
-    def split(self):
+    def make_window(self,X, y,input_steps : int, horizon_steps : int):
+        # read-only strided views over a single float32 copy of X and y (keras casts to float32 anyway)
+        return window_views(X.to_numpy(dtype=np.float32), y.to_numpy(dtype=np.float32), input_steps, horizon_steps)
+
+    def _inputs_outputs(self):
         X, y = self.__df, self.__df,
         if self.input_fields:
             X = self.__df[self.input_fields]
         if self.output_fields:
             y = self.__df[self.output_fields]
+        return X, y
+
+    def split(self):
+        X, y = self._inputs_outputs()
 
         X_train, X_test = train_test_split(X, test_size=0.2, shuffle=False)
         y_train, y_test = train_test_split(y, test_size=0.2, shuffle=False)
-        self.__X_train, self.__y_train = self.make_window(X_train,y_train,self.__input_steps,self.__horizon_steps)
+
+        # the windows are views over these, the tf.data pipeline reads them directly
+        self.__train_series = X_train.to_numpy(dtype=np.float32), y_train.to_numpy(dtype=np.float32)
+        self.__X_train, self.__y_train = window_views(*self.__train_series, self.__input_steps, self.__horizon_steps)
+        self.__training_end = self.__ts_column.iloc[len(X_train) - 1].to_pydatetime()
 
         self.__X_test, self.__y_test = self.make_window(X_test,y_test,self.__input_steps,self.__horizon_steps)
 
-    def train(self, epochs : int = 1, batch_size : int = 32):
+    def train(self, epochs : int = 1, batch_size : int = 32, batched : bool = False, streaming : bool = False,
+              shuffle_buffer : int = 1024, cache : str = None):
         if self.__X_train is None or self.__y_train is None:
             self.split()
-        es = tf.keras.callbacks.EarlyStopping(monitor='loss', patience = 2)
-
-        X_train, y_train = self.__X_train, self.__y_train
 
         if self.__model is None:
             return self.create_model()
-        model = self.__model
-        model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size, callbacks = [es])
+
+        fit_model(self.__model, *self.__train_series, self.__input_steps, self.__horizon_steps, epochs, batch_size,
+                  batched, streaming, shuffle_buffer, cache)
+        self.__trained_until = self.__training_end
+        self.__engine = None
         return 'done'
 
-    def predict(self):
-        X_test = self.__X_test
-        preds = []
-        for i in range(self.__horizon_steps):
-            pred = self.__model.predict(X_test[i:i+1])
-            pred = pred.reshape(-1, pred.shape[-1])
+    @property
+    def training_series(self):
+        # the normalized (X, y) the model is trained on
+        if self.__train_series is None:
+            self.split()
+        return self.__train_series
 
-            pred = self.__normalizer_used.inverse_transform(pred)
+    @property
+    def training_end(self):
+        # ts of the last sample of training_series
+        if self.__train_series is None:
+            self.split()
+        return self.__training_end
+
+    def fine_tune_series(self):
+        # the normalized (X, y) of the samples newer than trained_until, preceded by the input_steps samples
+        # the first of their windows needs, and the ts of the last sample. None if the model was never trained
+        # or there are not enough new samples for a window (at least horizon_steps)
+        if self.__trained_until is None:
+            return None
+
+        self.refresh_data()
+        first_new = int((self.__ts_column <= self.__trained_until).sum())
+        start = max(first_new - self.__input_steps, 0)
+
+        X, y = self._inputs_outputs()
+        X, y = X[start:].to_numpy(dtype=np.float32), y[start:].to_numpy(dtype=np.float32)
+        if first_new == len(self.__ts_column) or n_windows(len(X), self.__input_steps, self.__horizon_steps) == 0:
+            return None
+
+        return X, y, self.__ts_column.iloc[-1].to_pydatetime()
+
+    def fine_tune(self, epochs : int = 3, batch_size : int = 32):
+        # a few epochs on the new samples only, starting from the current weights and with the same scalers.
+        # Returns None if there is nothing to fine tune on
+        series = self.fine_tune_series()
+        if series is None or self.__model is None:
+            return None
+
+        X, y, until = series
+        fit_model(self.__model, X, y, self.__input_steps, self.__horizon_steps, epochs, batch_size)
+        self.__trained_until = until
+        self.__engine = None
+        return 'done'
+
+    @property
+    def model_config(self):
+        # arguments of build_model that give a model with the same architecture
+        return {'input_steps': self.__input_steps, 'horizon_steps': self.__horizon_steps,
+                'n_input_feats': self.__n_input_feats, 'n_features': self.__n_features,
+                'optimizer': self.__optim, 'loss_f': self.__loss}
+
+    def set_weights(self, weights : List[np.ndarray], trained_until : datetime = None):
+        # trained_until: ts of the last sample the weights were fitted on
+        with self.__weights_lock:
+            self.__model.set_weights(weights)
+            self.__engine = None
+            if trained_until is not None:
+                self.__trained_until = trained_until
+
+    def export(self, quantize : bool = None, num_threads : int = None):
+        # builds the engine predictions run on, None keeps the previous setting
+        if quantize is not None:
+            self.__inference['quantize'] = quantize
+        if num_threads is not None:
+            self.__inference['num_threads'] = num_threads
+
+        with self.__weights_lock:
+            self.__engine = self._build_engine()
+            return self.__engine
+
+    def _build_engine(self):
+        return InferenceEngine(self.__model, self.__input_steps, self.__n_input_feats, **self.__inference)
+
+    def predict(self, single_shot : bool = True):
+        # single_shot: one forward pass of the exported engine on the last input_steps samples gives the whole
+        # horizon, otherwise the keras model builds it one step at a time sliding over the test windows
+        with self.__weights_lock:
+            if single_shot:
+                preds = self._predict_horizon()
+            else:
+                preds = self._predict_steps()
 
-            preds.append(pred[0].astype(float))
-            X_test[i + 1, :-1] = X_test[i, 1:]
-            X_test[i + 1, -1] = pred[0, 0]
         new_dates = pd.date_range(self.__ts_column.tail(1).values[0], periods=self.__horizon_steps + 1, freq='T')[1:]
 
         if self.output_fields:
@@ -142,6 +346,35 @@ class Forecaster:
 
         return rows
 
+    def _predict_horizon(self):
+        X = self.__df
+        if self.input_fields:
+            X = self.__df[self.input_fields]
+
+        if self.__engine is None:
+            self.__engine = self._build_engine()
+
+        pred = self.__engine(X.tail(self.__input_steps).to_numpy(dtype=np.float32))    # (horizon_steps, n_features)
+
+        return self.__normalizer_used.inverse_transform(pred).astype(float)
+
+    def _predict_steps(self):
+        if self.__X_test is None:
+            self.split()
+        X_test = np.array(self.__X_test[:self.__horizon_steps + 1])   # the windows are read-only views
+        preds = []
+        for i in range(self.__horizon_steps):
+            pred = self.__model.predict(X_test[i:i+1])
+            pred = pred.reshape(-1, pred.shape[-1])
+
+            pred = self.__normalizer_used.inverse_transform(pred)
+
+            preds.append(pred[0].astype(float))
+            X_test[i + 1, :-1] = X_test[i, 1:]
+            X_test[i + 1, -1] = pred[0, 0]
+
+        return preds
+
     def create_model(self, optimizer = 'adam', loss_f = 'huber'):
         if self.output_fields:
             n_features = len(self.output_fields)
@@ -155,17 +388,13 @@ class Forecaster:
 
         self.__optim = optimizer
         self.__loss = loss_f
+        self.__n_input_feats = n_input_feats
+        self.__n_features = n_features
 
-        input_shape = (self.__input_steps, n_input_feats)
-        model = tf.keras.models.Sequential()
-        model.add(LSTM(128, return_sequences=True, input_shape=input_shape))
-        model.add(LSTM(128, return_sequences=False))
-        model.add(Dense(self.__horizon_steps * n_features))
-        model.add(Reshape([self.__horizon_steps, n_features]))
-        model.compile(optimizer=optimizer, loss=loss_f, metrics=['mse'])
-        model.build((None, input_shape[0], input_shape[1]))
+        model = build_model(self.__input_steps, self.__horizon_steps, n_input_feats, n_features, optimizer, loss_f)
 
         self.__model = model
+        self.__engine = None
 
     @property
     def model(self):
@@ -1,14 +1,80 @@
 from web_service.mongo.connect import db
+from web_service.mongo.watermarks import Watermarks, watermarks
+from web_service.utils.config import DATASET_CACHE_SIZE
+from collections import OrderedDict
+from threading import Lock
 import pandas as pd
 from typing import Dict, Union
 
 
-def mongo_to_dataframe(station_id : int, which_fields : Union[Dict,'all'] = 'all'):
+def _fetch(station_id : int, which_fields : Union[Dict,'all'], mongo_filter : Dict = None):
     if which_fields == 'all':
-        data = db[f'station_{station_id}'].find().sort('ts')
+        data = db[f'station_{station_id}'].find(mongo_filter or {}).sort('ts')
     else:
         which_fields['ts'] = 1
-        data = db[f'station_{station_id}'].find({}, which_fields).sort('ts')
-    df = pd.DataFrame(data).drop('_id', axis=1)
+        data = db[f'station_{station_id}'].find(mongo_filter or {}, which_fields).sort('ts')
+    df = pd.DataFrame(data)
+
+    return df.drop('_id', axis=1, errors='ignore')
+
+
+# Station datasets kept in memory, keyed by station and fields and tagged with the watermarks of the collection
+# when they were read: with the same generation only the samples newer than the last cached ts are fetched,
+# a new generation (a sample changed or was deleted) reads everything again.
+
+class DatasetCache:
+    def __init__(self, max_entries : int = DATASET_CACHE_SIZE, marks : Watermarks = watermarks):
+        self.__max_entries = max_entries
+        self.__marks = marks
+        self.__entries = OrderedDict()   # (station id, fields) : (generation, version, frame)
+        self.__fetching = {}             # (station id, fields) : Lock held while the frame is fetched
+        self.__lock = Lock()             # only around the dictionaries, never while reading mongo
+
+    @staticmethod
+    def _key(station_id : int, which_fields : Union[Dict,'all']):
+        if which_fields == 'all':
+            return station_id, 'all'
+        return station_id, frozenset(field for field in which_fields if field not in ('ts', '_id'))
+
+    def get(self, station_id : int, which_fields : Union[Dict,'all'] = 'all') -> pd.DataFrame:
+        # the frame is shared between callers and must not be modified
+        key = self._key(station_id, which_fields)
+        with self.__lock:
+            key_lock = self.__fetching.setdefault(key, Lock())
+
+        # one fetch at a time for a key, the callers waiting for it find its frame. The other keys are not blocked
+        with key_lock:
+            generation, version = self.__marks.get(f'station_{station_id}')
+            with self.__lock:
+                entry = self.__entries.get(key)
+                if entry is not None and entry[:2] == (generation, version) and not entry[2].empty:
+                    self.__entries.move_to_end(key)
+                    return entry[2]
 
-    return df
+            if entry is None or entry[0] != generation or entry[2].empty:
+                frame = _fetch(station_id, which_fields)
+            else:
+                newer = _fetch(station_id, which_fields, {'ts': {'$gt': entry[2]['ts'].iloc[-1]}})
+                frame = pd.concat([entry[2], newer], ignore_index=True) if not newer.empty else entry[2]
+
+            with self.__lock:
+                self.__entries[key] = (generation, version, frame)
+                self.__entries.move_to_end(key)
+                while len(self.__entries) > self.__max_entries:
+                    old, _ = self.__entries.popitem(last=False)
+                    if old != key:
+                        self.__fetching.pop(old, None)
+
+        return frame
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+
+dataset_cache = DatasetCache()
+
+
+def mongo_to_dataframe(station_id : int, which_fields : Union[Dict,'all'] = 'all'):
+    # a copy, the caller can modify it
+    return dataset_cache.get(station_id, which_fields).copy()
@@ -0,0 +1,64 @@
+import numpy as np
+import tensorflow as tf
+from threading import Lock
+from web_service.utils.config import INFERENCE_THREADS
+
+
+# The forward pass of a trained model on one window, exported for predictions: a TFLite model, optionally with
+# dynamic-range quantization (int8 weights, float activations), or the traced concrete function of the model
+# when the conversion fails. Both skip the keras call machinery, TFLite also the TF runtime.
+# The TFLite model holds a copy of the weights, a new engine is needed every time the model is trained.
+
+class InferenceEngine:
+    TFLITE = 'tflite'
+    CONCRETE_FUNCTION = 'concrete_function'
+
+    def __init__(self, model, input_steps : int, n_input_feats : int, quantize : bool = False,
+                 num_threads : int = INFERENCE_THREADS):
+        # num_threads: threads of the TFLite interpreter, the concrete function uses the ones of tensorflow
+        self.__lock = Lock()   # an interpreter runs one invocation at a time
+        self.__shape = (1, input_steps, n_input_feats)
+        self.__quantize = quantize
+        self.__num_threads = num_threads
+        self.__forward = tf.function(lambda x: model(x, training=False)).get_concrete_function(
+            tf.TensorSpec(self.__shape, tf.float32))
+
+        try:
+            self.__artifact = self._convert(model)
+            self.__interpreter = tf.lite.Interpreter(model_content=self.__artifact, num_threads=num_threads)
+            self.__interpreter.allocate_tensors()
+            self.__input = self.__interpreter.get_input_details()[0]['index']
+            self.__output = self.__interpreter.get_output_details()[0]['index']
+        except Exception:
+            self.__artifact = self.__interpreter = None
+
+    def _convert(self, model) -> bytes:
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([self.__forward], model)
+        if self.__quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        return converter.convert()
+
+    @property
+    def kind(self):
+        return self.CONCRETE_FUNCTION if self.__interpreter is None else self.TFLITE
+
+    @property
+    def artifact(self):
+        # the serialized TFLite model, None for a concrete function
+        return self.__artifact
+
+    @property
+    def settings(self):
+        return {'quantize': self.__quantize, 'num_threads': self.__num_threads}
+
+    def __call__(self, window : np.ndarray) -> np.ndarray:
+        # (input_steps, n_input_feats) -> (horizon_steps, n_features)
+        window = np.asarray(window, dtype=np.float32).reshape(self.__shape)
+
+        if self.__interpreter is None:
+            return self.__forward(tf.constant(window)).numpy()[0]
+
+        with self.__lock:
+            self.__interpreter.set_tensor(self.__input, window)
+            self.__interpreter.invoke()
+            return self.__interpreter.get_tensor(self.__output)[0]
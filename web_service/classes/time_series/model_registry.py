@@ -0,0 +1,155 @@
+import json
+import os
+import pickle
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Sequence
+from threading import RLock
+from typing import Dict, List
+from web_service.utils.config import MODEL_REGISTRY_PATH, MAX_RESIDENT_MODELS
+
+
+# Forecasters saved on disk as <path>/station_<id>/<model id>/{config.json, model.weights.h5, scalers.pkl}.
+# They are loaded on first use and at most max_resident of them are kept in memory, the least recently used
+# one is dropped when another one has to be loaded (it is on disk already, every change is saved).
+
+class ModelRegistry:
+    CONFIG = 'config.json'
+    WEIGHTS = 'model.weights.h5'
+    SCALERS = 'scalers.pkl'
+
+    def __init__(self, path : str = MODEL_REGISTRY_PATH, max_resident : int = MAX_RESIDENT_MODELS):
+        self.__path = path
+        self.__max_resident = max_resident
+        self.__resident = OrderedDict()     # (station id, model id) : Forecaster
+        self.__ids = {}                     # station id : model ids in order of creation
+        self.__versions = {}                # (station id, model id) : version, read once from the config
+        self.__lock = RLock()
+
+    def _dir(self, station_id : int, model_id : str = None):
+        station_dir = os.path.join(self.__path, f'station_{station_id}')
+        if model_id is None:
+            return station_dir
+        return os.path.join(station_dir, model_id)
+
+    def ids(self, station_id : int) -> List[str]:
+        with self.__lock:
+            if station_id not in self.__ids:
+                self.__ids[station_id] = self._read_ids(station_id)
+            return list(self.__ids[station_id])
+
+    def _read_ids(self, station_id : int) -> List[str]:
+        station_dir = self._dir(station_id)
+        if not os.path.isdir(station_dir):
+            return []
+
+        created = {}
+        for model_id in os.listdir(station_dir):
+            config_path = os.path.join(station_dir, model_id, self.CONFIG)
+            if os.path.isfile(config_path):     # skips models whose first save was interrupted
+                with open(config_path) as f:
+                    created[model_id] = json.load(f)['created']
+
+        return sorted(created, key=created.get)
+
+    def save(self, station_id : int, forecaster, model_id : str = None) -> str:
+        # a new model if model_id is None, returns the id
+        with self.__lock:
+            new = model_id is None
+            if new:
+                self.ids(station_id)    # read the existing ids before the new model is on disk
+                model_id = uuid.uuid4().hex
+                config = {'created': time.time(), 'version': 0}
+            else:
+                config = self.config(station_id, model_id)
+
+            model_dir = self._dir(station_id, model_id)
+            os.makedirs(model_dir, exist_ok=True)
+            config['settings'] = forecaster.settings
+            config['version'] = config.get('version', 0) + 1     # tags what was computed with the saved model
+
+            # each file is written aside and then renamed, a crash leaves the previous version
+            forecaster.model.save_weights(os.path.join(model_dir, 'tmp.' + self.WEIGHTS))
+            os.replace(os.path.join(model_dir, 'tmp.' + self.WEIGHTS), os.path.join(model_dir, self.WEIGHTS))
+            self._write(model_dir, self.SCALERS, pickle.dumps(forecaster.scalers))
+            self._write(model_dir, self.CONFIG, json.dumps(config).encode())
+
+            if new:
+                self.__ids[station_id].append(model_id)
+            self.__versions[(station_id, model_id)] = config['version']
+            self._keep(station_id, model_id, forecaster)
+
+        return model_id
+
+    @staticmethod
+    def _write(model_dir : str, name : str, content : bytes):
+        tmp_path = os.path.join(model_dir, 'tmp.' + name)
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, os.path.join(model_dir, name))
+
+    def config(self, station_id : int, model_id : str) -> Dict:
+        with open(os.path.join(self._dir(station_id, model_id), self.CONFIG)) as f:
+            return json.load(f)
+
+    def version(self, station_id : int, model_id : str) -> int:
+        # changes every time the model is saved, asked for every cached prediction so kept in memory
+        with self.__lock:
+            key = (station_id, model_id)
+            if key not in self.__versions:
+                self.__versions[key] = self.config(station_id, model_id).get('version', 0)
+            return self.__versions[key]
+
+    def load(self, station_id : int, model_id : str):
+        with self.__lock:
+            key = (station_id, model_id)
+            if key in self.__resident:
+                self.__resident.move_to_end(key)
+                return self.__resident[key]
+
+            from .forecaster import Forecaster
+
+            model_dir = self._dir(station_id, model_id)
+            with open(os.path.join(model_dir, self.SCALERS), 'rb') as f:
+                scalers = pickle.load(f)
+            forecaster = Forecaster.restore(self.config(station_id, model_id)['settings'], scalers,
+                                            os.path.join(model_dir, self.WEIGHTS))
+
+            self._keep(station_id, model_id, forecaster)
+            return forecaster
+
+    def _keep(self, station_id : int, model_id : str, forecaster):
+        self.__resident[(station_id, model_id)] = forecaster
+        self.__resident.move_to_end((station_id, model_id))
+
+        while len(self.__resident) > self.__max_resident:
+            self.__resident.popitem(last=False)
+
+    def delete(self, station_id : int, model_id : str):
+        with self.__lock:
+            self.ids(station_id)
+            self.__ids[station_id].remove(model_id)
+            self.__resident.pop((station_id, model_id), None)
+            self.__versions.pop((station_id, model_id), None)
+            shutil.rmtree(self._dir(station_id, model_id), ignore_errors=True)
+
+    def is_resident(self, station_id : int, model_id : str) -> bool:
+        return (station_id, model_id) in self.__resident
+
+
+class StationModels(Sequence):
+    # the models of a station as a list, indexes are the ones used by the API
+    def __init__(self, registry : ModelRegistry, station_id : int):
+        self.__registry = registry
+        self.__station = station_id
+
+    def __len__(self):
+        return len(self.__registry.ids(self.__station))
+
+    def __getitem__(self, idx : int):
+        return self.__registry.load(self.__station, self.__registry.ids(self.__station)[idx])
+
+
+model_registry = ModelRegistry()
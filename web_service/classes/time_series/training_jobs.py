@@ -0,0 +1,135 @@
+import multiprocessing
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Callable, Dict, Tuple, Union
+from web_service.utils.config import MAX_TRAINING_JOBS, FINISHED_JOBS_KEPT
+
+
+# Trainings run in a pool of worker processes so a request never waits for a fit. A worker gets the model
+# architecture, its current weights and the normalized training series, fits a copy of the model and sends the
+# weights back; they are set on the Forecaster when the job ends. Progress is shared through a Manager dict.
+
+def _train(job_id : str, progress, config : Dict, weights, X_series, y_series, options : Dict):
+    # runs in the worker process, which imports tensorflow only here
+    from .forecaster import build_model, fit_model, ProgressCallback
+
+    progress[job_id] = {'status': 'running', 'epoch': 0, 'loss': None}
+    model = build_model(**config)
+    model.set_weights(weights)
+    fit_model(model, X_series, y_series, config['input_steps'], config['horizon_steps'],
+              callbacks=[ProgressCallback(progress, job_id)], **options)
+
+    return model.get_weights()
+
+
+class TrainingJobs:
+    def __init__(self, max_jobs : int = MAX_TRAINING_JOBS, finished_kept : int = FINISHED_JOBS_KEPT):
+        self.__max_jobs = max_jobs
+        self.__finished_kept = finished_kept
+        self.__pool = None
+        self.__progress = None
+        self.__jobs = {}
+        self.__finished = deque()   # ids of the finished jobs, the oldest are forgotten
+        self.__lock = Lock()
+
+    def _start(self):
+        # spawn, forking a process that already loaded tensorflow is not safe
+        if self.__pool is None:
+            context = multiprocessing.get_context('spawn')
+            if self.__progress is None:     # kept when a broken pool is replaced
+                self.__progress = context.Manager().dict()
+            self.__pool = ProcessPoolExecutor(max_workers=self.__max_jobs, mp_context=context)
+
+    def running_job(self, station_id : int, model_id) -> Union[str, None]:
+        # id of the unfinished job training the model, if any. A job is finished once its weights are set and
+        # saved, which is after its future is done
+        for job_id, job in list(self.__jobs.items()):
+            if (job['station'], job['model']) == (station_id, model_id) and not job['finished']:
+                return job_id
+        return None
+
+    def submit(self, station_id : int, model_id, forecaster, epochs : int = 1, batch_size : int = 32, batched : bool = False,
+               streaming : bool = False, shuffle_buffer : int = 1024, on_done : Callable = None,
+               series : Tuple = None) -> str:
+        # on_done(forecaster) is called after the trained weights are set. series: the (X, y, ts of the last sample)
+        # to fit on, the training series of the forecaster if None.
+        # Returns None without queueing anything if the model is already being trained
+        with self.__lock:
+            if self.running_job(station_id, model_id):
+                return None
+            self._start()
+            if series is None:
+                series = (*forecaster.training_series, forecaster.training_end)
+            X_series, y_series, trained_until = series
+
+            job_id = uuid.uuid4().hex
+            self.__progress[job_id] = {'status': 'queued', 'epoch': 0, 'loss': None}
+            options = {'epochs': epochs, 'batch_size': batch_size, 'batched': batched, 'streaming': streaming,
+                       'shuffle_buffer': shuffle_buffer}
+
+            arguments = (_train, job_id, self.__progress, forecaster.model_config, forecaster.model.get_weights(),
+                         X_series, y_series, options)
+            try:
+                future = self.__pool.submit(*arguments)
+            except BrokenProcessPool:
+                # a worker died since the last job ended, the next pool is a new one
+                self._drop_pool(self.__pool)
+                self._start()
+                future = self.__pool.submit(*arguments)
+
+            self.__jobs[job_id] = {'station': station_id, 'model': model_id, 'forecaster': forecaster, 'epochs': epochs,
+                                   'future': future, 'on_done': on_done, 'trained_until': trained_until,
+                                   'pool': self.__pool, 'finished': False}
+
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+        return job_id
+
+    def _drop_pool(self, pool : ProcessPoolExecutor):
+        # called holding the lock, _start builds a new pool if the dropped one was the current one
+        if pool is self.__pool:
+            self.__pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, job_id : str, future : Future):
+        progress = dict(self.__progress[job_id], status='done')
+        job = self.__jobs[job_id]
+        try:
+            # fails also if the fields of the model were updated while it was training
+            weights = future.result()
+            job['forecaster'].set_weights(weights, job['trained_until'])
+            if job['on_done']:
+                job['on_done'](job['forecaster'])
+        except BrokenProcessPool as e:
+            # the worker died (out of memory, crash in tensorflow), the jobs it had fail with it
+            progress.update({'status': 'failed', 'error': f'the training process died: {e}'})
+            with self.__lock:
+                self._drop_pool(job['pool'])
+        except Exception as e:
+            progress.update({'status': 'failed', 'error': str(e)})
+
+        self.__progress[job_id] = progress
+
+        with self.__lock:
+            # only the status of a finished job is kept, and only for the last finished_kept jobs
+            job['finished'] = True
+            job['forecaster'] = job['on_done'] = job['pool'] = None
+            self.__finished.append(job_id)
+            while len(self.__finished) > self.__finished_kept:
+                old = self.__finished.popleft()
+                self.__jobs.pop(old, None)
+                self.__progress.pop(old, None)
+
+    def status(self, job_id : str, station_id : int = None) -> Union[Dict, None]:
+        # None if there is no such job (for that station)
+        with self.__lock:
+            job = self.__jobs.get(job_id)
+            if job is None or (station_id is not None and job['station'] != station_id):
+                return None
+
+            return dict(self.__progress[job_id], id=job_id, epochs=job['epochs'])
+
+
+training_jobs = TrainingJobs()
@@ -0,0 +1,30 @@
+import tensorflow as tf
+import numpy as np
+from .windowing import n_windows
+
+
+# tf.data version of the windows in windowing.py: X and y are held once as tensors and every window is gathered
+# from them while training, so the memory used is the series plus shuffle_buffer windows and the prefetched
+# batches, whatever the number of windows.
+
+def window_dataset(X : np.ndarray, y : np.ndarray, input_steps : int, horizon_steps : int, batch_size : int = 32,
+                   shuffle : bool = True, shuffle_buffer : int = 1024, seed : int = None, cache : str = None):
+    # cache='' keeps the windows in memory after the first epoch (only for series that fit), a path caches them
+    # on disk; the windows are cached before shuffling so every epoch still sees a new order
+    X = tf.convert_to_tensor(X, dtype=tf.float32)
+    y = tf.convert_to_tensor(y, dtype=tf.float32)
+    input_offsets = tf.range(input_steps, dtype=tf.int64)
+    horizon_offsets = tf.range(input_steps, input_steps + horizon_steps, dtype=tf.int64)
+
+    def window(start):
+        return tf.gather(X, start + input_offsets), tf.gather(y, start + horizon_offsets)
+
+    dataset = tf.data.Dataset.range(n_windows(len(X), input_steps, horizon_steps))
+    dataset = dataset.map(window, num_parallel_calls=tf.data.AUTOTUNE)
+
+    if cache is not None:
+        dataset = dataset.cache(cache)
+    if shuffle:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,70 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Iterator, Tuple
+
+
+# Windows of a time series as strided views: window i is X[i : i+input_steps] and the target is
+# y[i+input_steps : i+input_steps+horizon_steps]. The views share the memory of X and y, so building them costs
+# nothing whatever the number of windows, they are read-only and overlapping windows must not be written to.
+
+def n_windows(n_rows : int, input_steps : int, horizon_steps : int) -> int:
+    return max(n_rows - input_steps - horizon_steps + 1, 0)
+
+
+def window_views(X : np.ndarray, y : np.ndarray, input_steps : int, horizon_steps : int) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    # (n_windows, input_steps, n_input_features) and (n_windows, horizon_steps, n_output_features)
+    X, y = np.asarray(X), np.asarray(y)
+    n = n_windows(len(X), input_steps, horizon_steps)
+
+    if n == 0:
+        return np.empty((0, input_steps, X.shape[1]), X.dtype), np.empty((0, horizon_steps, y.shape[1]), y.dtype)
+
+    # sliding_window_view puts the window axis last, the transpose only swaps the strides
+    X_windows = sliding_window_view(X[:n + input_steps - 1], input_steps, axis=0).transpose(0, 2, 1)
+    y_windows = sliding_window_view(y[input_steps:input_steps + n + horizon_steps - 1], horizon_steps,
+                                    axis=0).transpose(0, 2, 1)
+
+    return X_windows, y_windows
+
+
+class WindowBatches:
+    # the windows returned by window_views in batches, only one batch at a time is copied out of the views.
+    # Has __len__ and __getitem__ like a keras Sequence, and can be iterated directly.
+    def __init__(self, X_windows : np.ndarray, y_windows : np.ndarray, batch_size : int = 32,
+                 shuffle : bool = False, seed : int = None):
+        self.__X, self.__y = X_windows, y_windows
+        self.__batch_size = batch_size
+        self.__shuffle = shuffle
+        self.__rng = np.random.default_rng(seed)
+        self.__order = np.arange(len(self.__X))
+
+        if shuffle:
+            self.__rng.shuffle(self.__order)
+
+    @property
+    def n_windows(self):
+        return len(self.__X)
+
+    def __len__(self):
+        return -(-len(self.__X) // self.__batch_size)
+
+    def __getitem__(self, idx : int) -> Tuple[np.ndarray, np.ndarray]:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+
+        chosen = self.__order[idx * self.__batch_size:(idx + 1) * self.__batch_size]
+        if not self.__shuffle:
+            chosen = slice(chosen[0], chosen[-1] + 1)   # a contiguous slice is cheaper than fancy indexing
+
+        return np.ascontiguousarray(self.__X[chosen]), np.ascontiguousarray(self.__y[chosen])
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def on_epoch_end(self):
+        if self.__shuffle:
+            self.__rng.shuffle(self.__order)
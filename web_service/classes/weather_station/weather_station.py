@@ -2,16 +2,21 @@ import datetime
 from .weather_station_data import WeatherData
 from web_service.mongo.connect import db
 from client_library.sky_scribe.sample import Sample
-from web_service.classes.time_series.forecaster import Forecaster
+from web_service.classes.time_series.training_jobs import training_jobs
+from web_service.classes.time_series.model_registry import model_registry, ModelRegistry, StationModels
+from web_service.classes.time_series.forecast_cache import forecast_cache
+from web_service.classes.statistics.statistics_backend import StatBackend
 from typing import List
 
 
 class WeatherStation(WeatherData):
-    def __init__(self, id: int):
+    def __init__(self, id: int, stat_backend: StatBackend = StatBackend.ROLLUP, registry : ModelRegistry = None):
+        # registry: where the models of the station are saved, the shared model_registry if None
+        self.__registry = registry if registry is not None else model_registry
         self.__id=id
         self.__loc=db.stations.find_one({'_id': id})['location']
-        WeatherData.__init__(self, db[f'station_{id}'])
-        self.__models = []
+        WeatherData.__init__(self, db[f'station_{id}'], stat_backend)
+        self.__models = StationModels(self.__registry, id)   # saved on disk, loaded when used
 
     @property
     def id(self):
@@ -100,6 +105,9 @@ class WeatherStation(WeatherData):
     def create_model(self, input_fields : List[str] = None, output_fields : List[str] = None,
                      input_steps = 300,horizon_steps : int = 250,
                               optimizer = 'adam', loss = 'huber'):
+        # tensorflow is loaded with the first model, stations that are only queried never import it
+        from web_service.classes.time_series.forecaster import Forecaster
+
         forecast = Forecaster(self.id, input_fields, output_fields,input_steps,horizon_steps)
 
         if input_fields is None:
@@ -110,21 +118,95 @@ class WeatherStation(WeatherData):
 
         forecast.create_model(optimizer, loss)
 
-        self.__models.append(forecast)
+        self.__registry.save(self.id, forecast)
         idx = len(self.__models)-1
 
         self.__horizon = horizon_steps
 
         return idx
 
+    def _model_id(self, idx : int):
+        return self.__registry.ids(self.id)[idx]
+
     def delete_model(self, idx : int):
-        self.models.pop(idx)
+        model_id = self._model_id(idx)
+        self.__registry.delete(self.id, model_id)
+        forecast_cache.invalidate(self.id, model_id)
 
     def update_model(self, idx : int, input_fields = None, output_fields = None):
-        self.models[idx].update_data(input_fields, output_fields)
+        forecaster = self.models[idx]
+        forecaster.update_data(input_fields, output_fields)
+        self.__registry.save(self.id, forecaster, self._model_id(idx))
+
+    def train_model(self, idx : int,epochs : int = 1,batch_size : int = 32, batched : bool = False,
+                    streaming : bool = False, shuffle_buffer : int = 1024):
+        forecaster = self.models[idx]
+        result = forecaster.train(epochs,batch_size, batched, streaming, shuffle_buffer)
+        self.__registry.save(self.id, forecaster, self._model_id(idx))
+        return result
+
+    def submit_training(self, idx : int, epochs : int = 1, batch_size : int = 32, batched : bool = False,
+                        streaming : bool = False, shuffle_buffer : int = 1024):
+        # trains in the background, returns the job id or None if the model is already being trained
+        model_id = self._model_id(idx)
+        save = lambda trained: self.__registry.save(self.id, trained, model_id)
+        return training_jobs.submit(self.id, model_id, self.models[idx], epochs, batch_size, batched, streaming,
+                                    shuffle_buffer, on_done=save)
+
+    def fine_tune_model(self, idx : int, epochs : int = 3, batch_size : int = 32):
+        forecaster = self.models[idx]
+        if forecaster.fine_tune(epochs, batch_size) is None:
+            raise ValueError(f'model {idx} has no new samples to be fine tuned on')
+
+        self.__registry.save(self.id, forecaster, self._model_id(idx))
+        return 'done'
+
+    def submit_fine_tuning(self, idx : int, epochs : int = 3, batch_size : int = 32):
+        # fine tunes in the background on the samples added since the last training,
+        # returns the job id or None if the model is already being trained
+        model_id = self._model_id(idx)
+        if training_jobs.running_job(self.id, model_id):
+            return None
+
+        series = self.models[idx].fine_tune_series()
+        if series is None:
+            raise ValueError(f'model {idx} has no new samples to be fine tuned on')
+
+        save = lambda trained: self.__registry.save(self.id, trained, model_id)
+        return training_jobs.submit(self.id, model_id, self.models[idx], epochs, batch_size, on_done=save, series=series)
+
+    def training_status(self, job_id : str):
+        return training_jobs.status(job_id, self.id)
+
+    def export_model(self, idx : int, quantize : bool = None, num_threads : int = None):
+        # the engine is rebuilt with the same settings after every training and when the model is reloaded
+        forecaster = self.models[idx]
+        engine = forecaster.export(quantize, num_threads)
+        self.__registry.save(self.id, forecaster, self._model_id(idx))
+        return {'engine': engine.kind, **engine.settings,
+                'size': len(engine.artifact) if engine.artifact is not None else None}
+
+    def predict(self, idx : int, single_shot : bool = True):
+        return self.cached_predict(idx, single_shot)[0]
+
+    def cached_predict(self, idx : int, single_shot : bool = True):
+        # the rows and whether they come from the cache. They are computed again after the model is saved or
+        # a sample of the station changes, the forecaster reads the new samples first so its input window moves
+        model_id = self._model_id(idx)
+        key = (self.id, model_id, single_shot)
+        tag = (self.__registry.version(self.id, model_id), self.version)   # read before predicting
+
+        rows = forecast_cache.get(key, tag)
+        if rows is not None:
+            return rows, True
+
+        forecaster = self.models[idx]
+        if forecaster.data_version != tag[1]:
+            forecaster.refresh_data()
+        rows = forecaster.predict(single_shot)
 
-    def train_model(self, idx : int,epochs : int = 1,batch_size : int = 32):
-        return self.models[idx].train(epochs,batch_size)
+        forecast_cache.put(key, tag, rows)
+        return rows, False
 
-    def predict(self, idx : int,):
-        return self.__models[idx].predict()
+    def forecast_cache_metrics(self):
+        return forecast_cache.metrics(self.id)
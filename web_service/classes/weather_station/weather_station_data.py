@@ -1,25 +1,51 @@
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterable, Tuple
 from datetime import datetime
 from abc import ABC
+import numpy as np
 from pandas.plotting._matplotlib import LinePlot
 from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+from web_service.mongo.indexes import ensure_station_indexes
+from web_service.mongo.watermarks import watermarks
 from client_library.sky_scribe.sample import Sample
 from web_service.classes.statistics.statistics import Statistics
+from web_service.classes.statistics.numpy_statistics import NumpyStatistics
+from web_service.classes.statistics.mongo_statistics import MongoStatistics
+from web_service.classes.statistics.rollups import Rollups
+from web_service.classes.statistics.running_statistics import RunningStatistics
+from web_service.classes.statistics.statistics_type import StatType
+from web_service.classes.statistics.statistics_backend import StatBackend
 from web_service.classes.graphs.boxplot import Boxplot
 from web_service.classes.graphs.scatterplot import ScatterPlot
 from web_service.classes.graphs.histogram import Histogram
 from web_service.classes.graphs.lineplot import LinePlot
+from web_service.classes.graphs.downsampling import downsample, figure_points, scatter_points
+from web_service.classes.graphs.summaries import histogram_summary, box_summary
+
+try:    # optional, decodes the documents straight into arrays
+    from pymongoarrow.api import Schema, find_numpy_all
+    from pyarrow import float64
+except ImportError:
+    find_numpy_all = None
 
 
 # handles a mongo collection referred to a single station
 
 class WeatherData(ABC):
-    def __init__(self, data: Collection):
+    def __init__(self, data: Collection, stat_backend: StatBackend = StatBackend.ROLLUP):
         self.__data = data
+        self.__stat_backend = stat_backend
+        ensure_station_indexes(self.__data)   # duplicates are rejected by mongo, no need to scan the dates
         self.update_oldest_date()
         self.update_newest_date()
 
-        self.__dates_used = [el['ts'] for el in self.data.find({},{'ts':1})]
+        self.__rollups = Rollups(data)
+        if self.__rollups.needs_rebuild():   # data loaded without going through this class, or an older format
+            self.__rollups.rebuild()
+
+        self.__running = {}   # pin : RunningStatistics of the samples up to self.__running_end, filled lazily
+        self.__running_end = None
+        self.__running_mark = None    # (generation, version) of the collection the accumulators are up to date with
 
     def update_oldest_date(self):
         self.__start =  self.data.find({},{'ts':1}).sort('ts').limit(1)[0]['ts']
@@ -39,53 +65,115 @@ class WeatherData(ABC):
     def data(self):
         return self.__data
 
+    @property
+    def rollups(self):
+        return self.__rollups
+
+    @property
+    def version(self):
+        # changes with every write to the collection
+        return watermarks.get(self.__data.name)[1]
+
+    @property
+    def generation(self):
+        # changes with every write that is not the append of a sample newer than the others
+        return watermarks.get(self.__data.name)[0]
+
+    @property
+    def stat_backend(self):
+        return self.__stat_backend
+
+    @stat_backend.setter
+    def stat_backend(self, backend: StatBackend):
+        self.__stat_backend = backend
+
     def add_measurement(self, data : Sample):
         data_dict = data.__dict__
         if '_modifiable' in data_dict.keys():
             data_dict.pop('_modifiable')
 
-        if data_dict['ts'] not in self.__dates_used:
-            self.data.insert_one(data_dict)
-            self.__dates_used.append(data_dict['ts'])
-        else:
+        try:
+            self.data.insert_one(data_dict)   # the unique ts index rejects duplicated samples
+        except DuplicateKeyError:
             return 400
 
+        self.__rollups.record(data_dict)
+
+        if data_dict['ts'] > self.__end:
+            self.__end = data_dict['ts']
+
+        # asked to mongo, another process may have written samples newer than self.end
+        if self.data.find_one({'ts': {'$gt': data_dict['ts']}}, {'_id': 1}) is None:
+            watermarks.appended(self.__data.name)
+        else:
+            watermarks.rewritten(self.__data.name)
+
     def get_measurement_by_date(self,date: datetime, which_fields: Dict = {'_id': 0}):
         my_dict=self.data.find_one({'ts' : date}, which_fields)
         if not my_dict:
             return None
         return my_dict
 
-    def get_measurements_by_date_range(self, start_date : datetime = None, end_date : datetime = None,
-                                       which_fields: Dict = {'_id': 0}):
+    def _find_page(self, mongo_filter : Dict, which_fields : Dict, limit : int = None, after : datetime = None):
+        # keyset pagination: samples are sorted by ts so the next page starts after the last ts of the previous one
+        if after is not None:
+            mongo_filter = {'$and': [mongo_filter, {'ts': {'$gt': after}}]}
+
+        cursor = self.data.find(mongo_filter, which_fields).sort('ts')
+        if limit:
+            cursor = cursor.limit(limit)
+
+        return cursor
+
+    def iter_measurements_by_date_range(self, start_date : datetime = None, end_date : datetime = None,
+                                        which_fields: Dict = {'_id': 0}, limit : int = None, after : datetime = None):
+        # cursor over the samples, documents are fetched in batches while iterating
         if not start_date:
             start_date = self.__start
         if not end_date:
             end_date = self.__end
 
-        data = list(self.data.find({
+        return self._find_page({
             'ts' : {
                 "$gte" : start_date,
                 "$lte" : end_date}},
-            which_fields).sort('ts'))
+            which_fields, limit, after)
+
+    def get_measurements_by_date_range(self, start_date : datetime = None, end_date : datetime = None,
+                                       which_fields: Dict = {'_id': 0}, limit : int = None, after : datetime = None):
+        data = list(self.iter_measurements_by_date_range(start_date, end_date, which_fields, limit, after))
         if len(data) == 0:
             return None
 
         return data
 
-    def get_measurement_mongo_filtered(self, mongo_filter : Dict, which_fields: Dict = {'_id': 0}):
-        data = list(self.data.find(mongo_filter, which_fields).sort('ts'))
+    def iter_measurement_mongo_filtered(self, mongo_filter : Dict, which_fields: Dict = {'_id': 0},
+                                        limit : int = None, after : datetime = None):
+        return self._find_page(mongo_filter, which_fields, limit, after)
+
+    def get_measurement_mongo_filtered(self, mongo_filter : Dict, which_fields: Dict = {'_id': 0},
+                                       limit : int = None, after : datetime = None):
+        data = list(self.iter_measurement_mongo_filtered(mongo_filter, which_fields, limit, after))
         if len(data) == 0:
             return None
 
         return data
 
     def update_measurement_field_by_date(self, date: datetime, value : Any, field: str):  # changes one parameter
-        result = self.data.update_one({'ts' : date}, {"$set" : {f"{field}" : value}})
+        try:
+            result = self.data.update_one({'ts' : date}, {"$set" : {f"{field}" : value}})
+        except DuplicateKeyError:
+            return 400
+
         if result.matched_count == 0:
             return None
 
+        self.__rollups.refresh(date)
+        watermarks.rewritten(self.__data.name)
+
         if field == 'ts':
+            self.__rollups.refresh(value)
+
             if value < self.start:
                 self.update_oldest_date()
 
@@ -104,6 +192,8 @@ class WeatherData(ABC):
         if result.matched_count == 0:
             return None
 
+        self.__rollups.refresh(new_sample.ts)
+        watermarks.rewritten(self.__data.name)
         return 200
 
     def delete_sample_by_date(self, date: datetime):
@@ -116,7 +206,8 @@ class WeatherData(ABC):
             self.update_oldest_date()
         if date == self.end:
             self.update_newest_date()
-        self.__dates_used.remove(date)
+        self.__rollups.refresh(date)
+        watermarks.rewritten(self.__data.name)
         return 200
 
     def _get_feature_array(self, pin, start_date: datetime = None, end_date: datetime = None):
@@ -134,60 +225,183 @@ class WeatherData(ABC):
 
         return feature_array
 
-    def mean(self, pin: str, start_date: datetime = None, end_date: datetime = None):
-        feature_array = self._get_feature_array(pin, start_date, end_date)
-        if not feature_array:
-            return None
+    def _get_feature_column(self, pin, start_date: datetime = None, end_date: datetime = None) -> np.ndarray:
+        # same as _get_feature_array but as a float64 array, samples without the pin become NaN
+        if not start_date:
+            start_date = self.__start
+        if not end_date:
+            end_date = self.__end
 
-        return Statistics.get_mean(feature_array)
+        mongo_filter = {'ts': {'$gte': start_date, '$lte': end_date}}
 
-    def max(self, pin: str, start_date: datetime = None, end_date: datetime = None):
-        feature_array = self._get_feature_array(pin, start_date, end_date)
-        if not feature_array:
-            return None
+        if find_numpy_all is not None:
+            return find_numpy_all(self.data, mongo_filter, schema=Schema({pin: float64()}), sort=[('ts', 1)])[pin]
 
-        return Statistics.get_max(feature_array)
+        cursor = self.data.find(mongo_filter, {pin: 1, '_id': 0}).sort('ts')
+        return np.fromiter((el[pin] if isinstance(el.get(pin), (int, float)) else np.nan for el in cursor),
+                           dtype=np.float64)
 
-    def min(self, pin: str, start_date: datetime = None, end_date: datetime = None):
-        feature_array = self._get_feature_array(pin, start_date, end_date)
-        if not feature_array:
-            return None
+    def _compute_statistics(self, pins: Iterable[str], stat_types: Iterable[StatType],
+                            start_date: datetime = None, end_date: datetime = None):
+        # {pin : {stat_type : value}}, a value is None if the pin has no data in the range
+        if start_date is None and end_date is None and self.__stat_backend == StatBackend.ROLLUP:
+            return self._running_statistics(pins, stat_types)   # the other backends always read the samples
+
+        if not start_date:
+            start_date = self.__start
+        if not end_date:
+            end_date = self.__end
+
+        pins, stat_types = list(pins), list(stat_types)
+
+        if self.__stat_backend == StatBackend.MONGO:
+            mongo_filter = {'ts': {'$gte': start_date, '$lte': end_date}}
+            result = next(self.data.aggregate(MongoStatistics.pipeline(mongo_filter, pins, stat_types)), None)
+
+            return MongoStatistics.unpack(result, pins, stat_types)
+
+        if self.__stat_backend == StatBackend.ROLLUP:
+            moments = self.__rollups.moments(pins, start_date, end_date)
+
+            return {pin: Rollups.to_statistics(moments[pin], stat_types) for pin in pins}
+
+        if self.__stat_backend == StatBackend.NUMPY:
+            functions = {StatType.MEAN: NumpyStatistics.get_mean,
+                         StatType.MAX: NumpyStatistics.get_max,
+                         StatType.MIN: NumpyStatistics.get_min,
+                         StatType.STD: NumpyStatistics.get_std}
+            stats = {}
+            for pin in pins:
+                feature_column = self._get_feature_column(pin, start_date, end_date)
+                stats[pin] = {stat_type: functions[stat_type](feature_column) for stat_type in stat_types}
+
+            return stats
+
+        functions = {StatType.MEAN: Statistics.get_mean,
+                     StatType.MAX: Statistics.get_max,
+                     StatType.MIN: Statistics.get_min,
+                     StatType.STD: Statistics.get_std}
+        stats = {}
+        for pin in pins:
+            feature_array = self._get_feature_array(pin, start_date, end_date)
+            stats[pin] = {stat_type: functions[stat_type](feature_array) if feature_array else None
+                          for stat_type in stat_types}
+
+        return stats
+
+    def _running_statistics(self, pins: Iterable[str], stat_types: Iterable[StatType]):
+        # whole history statistics answered from memory. The accumulators follow the watermarks, which every worker
+        # bumps: a new generation reads them again from the rollups, a new version only adds the samples appended
+        # after the last one they include. Pins not accumulated yet are read from the rollups
+        pins, stat_types = list(pins), list(stat_types)
+
+        mark = watermarks.get(self.__data.name)     # before the dates, a later write is seen by the next call
+        if mark != self.__running_mark:
+            self.update_oldest_date()
+            self.update_newest_date()
 
-        return Statistics.get_min(feature_array)
+            if self.__running_mark is None or mark[0] != self.__running_mark[0]:
+                self.__running.clear()
+            elif self.__running:
+                mongo_filter = {'ts': {'$gt': self.__running_end, '$lte': self.__end}}
+                for sample in self.data.find(mongo_filter, {pin: 1 for pin in self.__running}).sort('ts'):
+                    for pin, accumulator in self.__running.items():
+                        value = sample.get(pin)
+                        if isinstance(value, (int, float)) and not isinstance(value, bool):
+                            accumulator.push(value)
+
+            self.__running_mark = mark
+            self.__running_end = self.__end
+
+        missing = [pin for pin in pins if pin not in self.__running]
+        if missing:
+            moments = self.__rollups.moments(missing, self.__start, self.__running_end)
+            for pin in missing:
+                self.__running[pin] = RunningStatistics.from_moments(moments[pin])
+
+        return {pin: {stat_type: self.__running[pin].get(stat_type) for stat_type in stat_types} for pin in pins}
+
+    def _statistic(self, stat_type: StatType, pin: str, start_date: datetime = None, end_date: datetime = None):
+        return self._compute_statistics([pin], [stat_type], start_date, end_date)[pin][stat_type]
+
+    def mean(self, pin: str, start_date: datetime = None, end_date: datetime = None):
+        return self._statistic(StatType.MEAN, pin, start_date, end_date)
+
+    def max(self, pin: str, start_date: datetime = None, end_date: datetime = None):
+        return self._statistic(StatType.MAX, pin, start_date, end_date)
+
+    def min(self, pin: str, start_date: datetime = None, end_date: datetime = None):
+        return self._statistic(StatType.MIN, pin, start_date, end_date)
 
     def std(self, pin: str, start_date: datetime = None, end_date: datetime = None):
-        feature_array = self._get_feature_array(pin, start_date, end_date)
-        if not feature_array:
-            return None
+        return self._statistic(StatType.STD, pin, start_date, end_date)
+
+    def all_statistics(self, pins: Iterable[str], start_date: datetime = None, end_date: datetime = None):
+        # every statistic of every pin at once, with the mongo backend this is a single aggregation
+        pins = list(pins)
+        stats = self._compute_statistics(pins, StatType, start_date, end_date)
 
-        return Statistics.get_std(feature_array)
+        return {pin: {'mean': stats[pin][StatType.MEAN],
+                      'max': stats[pin][StatType.MAX],
+                      'min': stats[pin][StatType.MIN],
+                      'stdev': stats[pin][StatType.STD]}
+                for pin in pins}
 
-    def box_plot(self, pin: str, figsize: Tuple[int ,int] = (10, 10)):
-        array = self._get_feature_array(pin)
+    def box_plot(self, pin: str, figsize: Tuple[int ,int] = (10, 10), start_date: datetime = None,
+                 end_date: datetime = None):
+        return Boxplot(self.box_summary(pin, start_date, end_date), pin, figsize).plot_graph()
 
-        return Boxplot(array, pin, figsize).plot_graph()
+    def box_summary(self, pin: str, start_date: datetime = None, end_date: datetime = None):
+        return box_summary(self._get_feature_column(pin, start_date, end_date))
 
-    def scatter_plot(self, pin1: str, pin2: str, figsize: Tuple[int ,int] = (10, 10)):
+    def scatter_plot(self, pin1: str, pin2: str, figsize: Tuple[int ,int] = (10, 10), start_date: datetime = None,
+                     end_date: datetime = None):
 
-        array1 = self._get_feature_array(pin1)
-        array2 = self._get_feature_array(pin2)
+        array1 = self._get_feature_array(pin1, start_date, end_date)
+        array2 = self._get_feature_array(pin2, start_date, end_date)
 
         return ScatterPlot(array1, array2, pin1, pin2, figsize).plot_graph()
 
-    def line_plot(self, pin1: str, pin3: str=None, figsize:Tuple[int ,int] = (10, 10)):
-        array1 = self._get_feature_array(pin1)
+    def line_plot(self, pin1: str, pin3: str=None, figsize:Tuple[int ,int] = (10, 10), start_date: datetime = None,
+                  end_date: datetime = None, downsampling: str = 'lttb'):
+        # downsampling: 'lttb', 'minmax' or None, reduces the samples to what the width of the figure can show
         pin2 = "ts"
-        array2 = self._get_feature_array(pin2)
+        array1, array2, array3 = self.line_data(pin1, pin3, figsize, start_date, end_date, downsampling)
 
         if pin3 is not None:
-            array3 = self._get_feature_array(pin3)
-
             return LinePlot(array1, array2, pin1, pin2, pin3, array3, figsize)
 
-        return LinePlot(array1, array2, pin1, pin2, figsize)
+        return LinePlot(array1, array2, pin1, pin2, figsize=figsize)
+
+    def line_data(self, pin1: str, pin3: str = None, figsize: Tuple[int ,int] = (10, 10), start_date: datetime = None,
+                  end_date: datetime = None, downsampling: str = 'lttb'):
+        # the values of pin1, the ts and the values of pin3 (None without pin3) that a line plot draws
+        array1 = self._get_feature_array(pin1, start_date, end_date)
+        array2 = self._get_feature_array('ts', start_date, end_date)
+        array3 = self._get_feature_array(pin3, start_date, end_date) if pin3 is not None else None
+
+        if downsampling and array1 is not None and array2 is not None:
+            series = [array1] if array3 is None else [array1, array3]
+            kept = downsample(array2, series, figure_points(figsize), downsampling)
+            array1, array2 = np.asarray(array1)[kept], np.asarray(array2)[kept]
+            if array3 is not None:
+                array3 = np.asarray(array3)[kept]
+
+        return array1, array2, array3
+
+    def scatter_data(self, pin1: str, pin2: str, figsize: Tuple[int ,int] = (10, 10), start_date: datetime = None,
+                     end_date: datetime = None):
+        # the points of a scatter plot, one per pixel of the figure that has any
+        x = self._get_feature_column(pin1, start_date, end_date)
+        y = self._get_feature_column(pin2, start_date, end_date)
+        kept = scatter_points(x, y, figure_points(figsize), figure_points(figsize, axis=1))
+
+        return x[kept], y[kept]
 
-    def histogram(self, pin: str, figsize: Tuple[int ,int] = (10, 10)):
-        array = self._get_feature_array(pin)
+    def histogram(self, pin: str, figsize: Tuple[int ,int] = (10, 10), start_date: datetime = None,
+                  end_date: datetime = None):
+        return Histogram(self.histogram_summary(pin, start_date, end_date), pin, figsize).plot_graph()
 
-        return Histogram(array, pin, figsize).plot_graph()
+    def histogram_summary(self, pin: str, start_date: datetime = None, end_date: datetime = None):
+        return histogram_summary(self._get_feature_column(pin, start_date, end_date))
 
@@ -0,0 +1,41 @@
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from typing import Dict, Iterable, List
+from .connect import db, stations
+from ..utils.config import INDEXED_PINS
+
+
+# every query on a station collection filters or sorts on ts, pins listed in INDEXED_PINS
+# also get a (pin, ts) index for the filtered sample queries
+
+def ensure_station_indexes(collection : Collection, hot_pins : Iterable[str] = ()):
+    collection.create_index([('ts', ASCENDING)], unique=True)   # also rejects duplicated samples
+
+    for pin in hot_pins:
+        collection.create_index([(pin, ASCENDING), ('ts', ASCENDING)])
+
+
+def ensure_all_indexes(indexed_pins : Dict[int, Iterable[str]] = None):
+    if indexed_pins is None:
+        indexed_pins = INDEXED_PINS
+
+    for station in stations.find({}, {'_id': 1}):
+        ensure_station_indexes(db[f'station_{station["_id"]}'], indexed_pins.get(station['_id'], ()))
+
+
+def plan_stages(explain : Dict) -> List[str]:
+    # names of the stages of the winning plan of an explain() output, e.g. ['LIMIT', 'FETCH', 'IXSCAN']
+    stages = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if 'stage' in node:
+                stages.append(node['stage'])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explain['queryPlanner']['winningPlan'])
+    return stages
@@ -1,10 +1,16 @@
 from pandas import DataFrame
 from .connect import db, stations
 from typing import Iterable
+from web_service.classes.statistics.rollups import Rollups
+from .indexes import ensure_station_indexes
+from .watermarks import watermarks
 
 
 def samples_from_df(df : DataFrame, station : int):
+    ensure_station_indexes(db[f'station_{station}'])
     db[f'station_{station}'].insert_many(df.to_dict('records'))
+    Rollups(db[f'station_{station}']).rebuild()   # bulk inserts skip the incremental rollup updates
+    watermarks.rewritten(f'station_{station}')      # the samples can be anywhere in the history
 
 
 def insert_station(number : int, location : str, available_data : Iterable[str]):
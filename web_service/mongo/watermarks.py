@@ -0,0 +1,27 @@
+from pymongo.collection import Collection
+from typing import Tuple
+from .connect import db
+
+
+# Write counters of the station collections, kept in the watermarks collection so that every worker process
+# sees the writes of the others. WeatherData and the bulk loader bump them after every write they make.
+# version changes with every write, generation only with the writes that are not appends of a sample newer than
+# all the others (updates, deletes, inserts in the past, bulk loads): whatever was derived from the collection
+# stays valid with the same generation, and only needs the samples after its last ts if the version changed.
+
+class Watermarks:
+    def __init__(self, collection : Collection):
+        self.__collection = collection
+
+    def get(self, name : str) -> Tuple[int, int]:
+        counters = self.__collection.find_one({'_id': name}) or {}
+        return counters.get('generation', 0), counters.get('version', 0)
+
+    def appended(self, name : str):
+        self.__collection.update_one({'_id': name}, {'$inc': {'version': 1}}, upsert=True)
+
+    def rewritten(self, name : str):
+        self.__collection.update_one({'_id': name}, {'$inc': {'generation': 1, 'version': 1}}, upsert=True)
+
+
+watermarks = Watermarks(db.watermarks)
@@ -0,0 +1,47 @@
+import io
+from itertools import islice
+from typing import Dict, Iterable
+
+try:    # optional, only needed for the arrow and parquet formats of the samples endpoints
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+COLUMNAR_FORMATS = {'arrow': 'application/vnd.apache.arrow.stream',
+                    'parquet': 'application/vnd.apache.parquet'}
+
+
+def columnar_available() -> bool:
+    return pa is not None
+
+
+def cursor_to_table(cursor : Iterable[Dict], batch_size : int = 10000):
+    # the documents are converted one batch at a time, so at most batch_size of them are held as python objects
+    cursor = iter(cursor)
+    tables = []
+
+    while True:
+        batch = list(islice(cursor, batch_size))
+        if not batch:
+            break
+        tables.append(pa.Table.from_pylist(batch))
+
+    if not tables:
+        return pa.table({})
+
+    # a pin can be int in one batch and double in another, or missing from a whole batch
+    return pa.concat_tables(tables, promote_options='permissive')
+
+
+def table_to_bytes(table, fmt : str) -> bytes:
+    sink = io.BytesIO()
+
+    if fmt == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+
+    return sink.getvalue()
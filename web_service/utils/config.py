@@ -1 +1,25 @@
+import os
+
 MONGO_URL = 'mongodb://localhost:27017'
+
+INDEXED_PINS = {}   # station id : pins that get a (pin, ts) index, e.g. {0 : ['temp_c']}
+
+MAX_TRAINING_JOBS = 2   # forecaster trainings running at the same time, the others wait in the queue
+FINISHED_JOBS_KEPT = 100   # finished trainings whose status can still be read
+
+MODEL_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'saved_models')
+MAX_RESIDENT_MODELS = 4   # forecasters kept in memory, the least recently used are reloaded from disk when needed
+
+DATASET_CACHE_SIZE = 8   # station datasets (one per set of fields) kept in memory for the forecasters
+
+INFERENCE_THREADS = 2   # threads of the TFLite interpreter of each model
+QUANTIZE_INFERENCE = False   # dynamic-range quantization of the exported models, smaller and faster but less precise
+
+FORECAST_CACHE_SIZE = 32   # forecasts kept in memory, one per model and prediction mode
+
+GRAPH_CACHE_SIZE = 64   # rendered graphs kept in memory
+GRAPH_CACHE_PATH = None   # directory keeping the rendered graphs on disk too, e.g. os.path.join(..., 'graph_cache')
+GRAPH_CACHE_FILES = 1000   # graphs kept on disk, the least recently used are removed
+
+RENDER_WORKERS = 2   # threads drawing graphs
+RENDER_QUEUE = 8   # graph requests waiting for a render thread, the others wait before being queued
@@ -1,4 +1,7 @@
 from web_service.classes.weather_station.weather_station import WeatherStation
+from web_service.mongo.indexes import ensure_all_indexes
+
+ensure_all_indexes()
 
 lugano_station = WeatherStation(0)
 